@@ -1,38 +1,37 @@
-import streamlit as st
-import zipfile
 import os
-from io import BytesIO
-from src.carousel_generator import CarouselGenerator, example_solid_colors
-from src.content_generator import content_generator
+import streamlit as st
+from src.carousel_generator import example_solid_colors
+from src.carousel_store import carousel_key, get_carousel_store
+from src.content_generator import summarize_transcription
+from src.db import get_thread_source_transcription_in_json
+from src.metrics import metrics, serve_metrics
+from src.output_sinks import ZipSink
+from src.render_queue import QueueFullError, get_render_queue
+from src.resources import get_resource, load_environment
 
+load_environment()
 
-def generate_content(url: str):
-    content = content_generator(url)
-    carousel_generator = CarouselGenerator()
-    config = example_solid_colors()
-    carousel = carousel_generator.generate_carousel(
-        data=content, output_dir="carousel_output", background_configs=config
+# Streamlit reruns this script on every interaction, the server starts once
+if metrics.enabled:
+    get_resource(
+        "metrics_server",
+        lambda: serve_metrics(
+            port=int(os.getenv("METRICS_PORT", "9108")),
+            host=os.getenv("METRICS_HOST", "127.0.0.1"),
+        ),
     )
 
-    # Ensure this returns a list of file paths
-    if isinstance(carousel, list) and all(isinstance(p, str) for p in carousel):
-        return carousel
-    else:
-        # Try to collect file paths manually from the output dir
-        return [
-            os.path.join("carousel_output", f)
-            for f in os.listdir("carousel_output")
-            if f.endswith((".png", ".jpg"))
-        ]
 
+def generate_content(transcription, config):
+    """Summarize the transcription and stream its rendered pages"""
+    content = summarize_transcription(transcription)
+
+    # Pages are rendered in a shared render slot and handed over one by one
+    return get_render_queue().stream(content, background_configs=config)
 
-def zip_files(file_paths):
-    zip_buffer = BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w") as zip_file:
-        for path in file_paths:
-            zip_file.write(path, arcname=os.path.basename(path))
-    zip_buffer.seek(0)
-    return zip_buffer
+
+def show_thumbnail(columns, index, data):
+    columns[index % len(columns)].image(data, caption=f"Page {index + 1}", width=160)
 
 
 # Streamlit UI
@@ -44,12 +43,41 @@ if st.button("Generate Carousel"):
     if not url:
         st.warning("Please enter a valid YouTube URL.")
     else:
-        with st.spinner("Generating carousel..."):
-            output_files = generate_content(url)
-            if output_files:
-                st.success("Carousel generated successfully!")
+        config = example_solid_colors()
+        store = get_carousel_store()
+        transcription = get_thread_source_transcription_in_json(url)
+        key = carousel_key(url, transcription, config)
+        # Finished carousels, pre-generated or not, are served from the store
+        zip_data = store.get(key)
+        try:
+            if zip_data is not None:
+                columns = st.columns(4)
+                for index, (_, data) in enumerate(store.get_pages(key) or []):
+                    show_thumbnail(columns, index, data)
+            else:
+                with st.spinner("Summarizing video..."):
+                    pages = generate_content(transcription, config)
 
-                zip_data = zip_files(output_files)
+                # A rerun stopping the script must not leave the render running
+                with pages:
+                    # Thumbnails appear as soon as each page is encoded
+                    progress = st.progress(0.0, text="Rendering pages...")
+                    columns = st.columns(4)
+                    sink = ZipSink()
+                    for page in pages:
+                        sink.write(page.filename, page.data)
+                        show_thumbnail(columns, page.index, page.data)
+                        progress.progress(
+                            (page.index + 1) / page.total,
+                            text=f"Rendered {page.index + 1} of {page.total} pages",
+                        )
+                zip_data = sink.result().getvalue()
+                store.put(key, zip_data, url=url)
+        except QueueFullError:
+            st.error("Too many carousels are being generated, please retry.")
+        else:
+            if zip_data:
+                st.success("Carousel generated successfully!")
 
                 st.download_button(
                     label="📥 Download Carousel (ZIP)",
@@ -0,0 +1,74 @@
+import threading
+from collections import OrderedDict
+
+
+class BackgroundCache:
+    """Bounded LRU cache of prepared background images"""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def image_size(image):
+        """Approximate memory held by an image in bytes"""
+        return image.width * image.height * len(image.getbands())
+
+    def get(self, key):
+        """Get a cached image, or None on a miss"""
+        with self._lock:
+            image = self._entries.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key, image):
+        """Store an image, evicting least recently used entries over the cap"""
+        size = self.image_size(image)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self.image_size(self._entries.pop(key))
+            self._entries[key] = image
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= self.image_size(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every cached image"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Get hit, miss and eviction counters with current usage"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_shared_background_cache = BackgroundCache()
+
+
+def get_background_cache():
+    """Get the process-wide background cache"""
+    return _shared_background_cache
@@ -0,0 +1,283 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from src.carousel_generator import example_solid_colors, get_carousel_generator
+from src.content_generator import create_llm, summarize_transcription
+from src.db import get_transcriptions
+from src.output_sinks import DirectorySink
+from src.resources import load_environment
+
+
+def read_jobs(input_path):
+    """Read one job per JSONL line: a url plus optional background_configs"""
+    jobs = []
+    with open(input_path, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            job = json.loads(line)
+            job["url"] = job.get("url") or job["source_url"]
+            jobs.append(job)
+    return jobs
+
+
+def job_output_dir(output_root, job):
+    """Output directory of a job, named by its id or a hash of its URL"""
+    if job.get("output_dir"):
+        return job["output_dir"]
+    name = job.get("id")
+    if not name:
+        name = hashlib.sha1(job["url"].encode("utf-8")).hexdigest()[:16]
+    return os.path.join(output_root, str(name))
+
+
+class Manifest:
+    """Append-only JSONL record of finished and failed URLs"""
+
+    def __init__(self, path):
+        self.path = path
+        self.status = {}
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                line = "\n"
+                for number, line in enumerate(file, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                        self.status[entry["url"]] = entry["status"]
+                    except (ValueError, KeyError, TypeError):
+                        # A run killed mid-append leaves a partial last line
+                        print(f"Skipping unreadable line {number} of {path}")
+            if not line.endswith("\n"):
+                # New records must not be appended to the partial line
+                with open(path, "a", encoding="utf-8") as file:
+                    file.write("\n")
+
+    def is_done(self, url):
+        return self.status.get(url) == "done"
+
+    def record(self, url, status, **details):
+        entry = {"url": url, "status": status, "time": time.time(), **details}
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.status[url] = status
+
+
+class StageStats:
+    """Completed items, failures and busy time of one pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.first_start = None
+        self.last_end = None
+
+    def started(self):
+        if self.first_start is None:
+            self.first_start = time.perf_counter()
+
+    def finished(self, items, seconds, failed=0):
+        self.completed += items
+        self.failed += failed
+        self.busy_seconds += seconds
+        self.last_end = time.perf_counter()
+
+    def report(self):
+        wall = (
+            self.last_end - self.first_start
+            if self.first_start is not None and self.last_end is not None
+            else 0.0
+        )
+        throughput = self.completed / wall if wall else 0.0
+        return (
+            f"{self.name:<10} {self.completed:>6} done {self.failed:>5} failed "
+            f"{wall:>8.1f}s wall {self.busy_seconds:>9.1f}s busy "
+            f"{throughput:>8.2f}/s"
+        )
+
+
+def fetch_batch(urls):
+    start = time.perf_counter()
+    transcriptions = get_transcriptions(urls)
+    return transcriptions, time.perf_counter() - start
+
+
+def summarize_job(transcriptions, llm, chunked):
+    start = time.perf_counter()
+    content = summarize_transcription(transcriptions, llm=llm, chunked=chunked)
+    return content, time.perf_counter() - start
+
+
+def render_job(content, background_configs, output_dir):
+    """Render one carousel into its own directory inside a worker process"""
+    start = time.perf_counter()
+    filepaths = get_carousel_generator().generate_carousel(
+        data=content,
+        background_configs=background_configs,
+        sink=DirectorySink(output_dir),
+    )
+    return len(filepaths), time.perf_counter() - start
+
+
+def run_batch(
+    input_path,
+    output_root="carousel_batch",
+    fetch_batch_size=50,
+    summarize_workers=8,
+    render_workers=None,
+    max_in_flight=None,
+    chunked=False,
+    llm=None,
+):
+    """Generate a carousel for every URL in a JSONL file, resuming from the manifest
+
+    Transcripts are fetched in bulk, summarized in a thread pool and rendered
+    in a process pool, with the stages overlapping. At most max_in_flight
+    URLs are between fetch and render at any time.
+    """
+    os.makedirs(output_root, exist_ok=True)
+    manifest = Manifest(os.path.join(output_root, "manifest.jsonl"))
+    jobs = read_jobs(input_path)
+    queue = deque(job for job in jobs if not manifest.is_done(job["url"]))
+    print(f"{len(jobs)} URLs, {len(jobs) - len(queue)} already done")
+
+    render_workers = render_workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * (summarize_workers + render_workers)
+    stats = {name: StageStats(name) for name in ("fetch", "summarize", "render")}
+    if llm is None and queue:
+        llm = create_llm()
+
+    fetch_pool = ThreadPoolExecutor(max_workers=1)
+    summarize_pool = ThreadPoolExecutor(max_workers=summarize_workers)
+    render_pool = ProcessPoolExecutor(max_workers=render_workers)
+    with fetch_pool, summarize_pool, render_pool:
+        in_flight = {}
+        fetching = 0
+        active_jobs = 0
+
+        while queue or in_flight:
+            # Fetch the next batch only while downstream stages have room
+            if queue and not fetching and active_jobs < max_in_flight:
+                batch = [
+                    queue.popleft() for _ in range(min(fetch_batch_size, len(queue)))
+                ]
+                stats["fetch"].started()
+                future = fetch_pool.submit(fetch_batch, [job["url"] for job in batch])
+                in_flight[future] = ("fetch", batch)
+                fetching += 1
+                active_jobs += len(batch)
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, item = in_flight.pop(future)
+                try:
+                    result, seconds = future.result()
+                except Exception as e:
+                    if stage == "fetch":
+                        fetching -= 1
+                        failed_jobs = item
+                    else:
+                        failed_jobs = [item]
+                    stats[stage].finished(0, 0.0, failed=len(failed_jobs))
+                    for job in failed_jobs:
+                        manifest.record(job["url"], "failed", stage=stage, error=str(e))
+                    active_jobs -= len(failed_jobs)
+                    continue
+
+                if stage == "fetch":
+                    fetching -= 1
+                    missing = [job for job in item if job["url"] not in result]
+                    stats["fetch"].finished(
+                        len(item) - len(missing), seconds, failed=len(missing)
+                    )
+                    for job in missing:
+                        manifest.record(
+                            job["url"],
+                            "failed",
+                            stage="fetch",
+                            error="no transcription",
+                        )
+                        active_jobs -= 1
+                    for job in item:
+                        if job["url"] in result:
+                            stats["summarize"].started()
+                            next_future = summarize_pool.submit(
+                                summarize_job, result[job["url"]], llm, chunked
+                            )
+                            in_flight[next_future] = ("summarize", job)
+
+                elif stage == "summarize":
+                    stats["summarize"].finished(1, seconds)
+                    stats["render"].started()
+                    next_future = render_pool.submit(
+                        render_job,
+                        result,
+                        item.get("background_configs") or example_solid_colors(),
+                        job_output_dir(output_root, item),
+                    )
+                    in_flight[next_future] = ("render", item)
+
+                else:
+                    stats["render"].finished(1, seconds)
+                    manifest.record(
+                        item["url"],
+                        "done",
+                        output_dir=job_output_dir(output_root, item),
+                        pages=result,
+                    )
+                    active_jobs -= 1
+
+    print("\nStage throughput:")
+    for stage_stats in stats.values():
+        print(stage_stats.report())
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate carousels in bulk from a JSONL file of URLs"
+    )
+    parser.add_argument("input", help='JSONL file with one {"url": ...} per line')
+    parser.add_argument("--output-dir", default="carousel_batch")
+    parser.add_argument("--fetch-batch-size", type=int, default=50)
+    parser.add_argument("--summarize-workers", type=int, default=8)
+    parser.add_argument("--render-workers", type=int, default=None)
+    parser.add_argument("--max-in-flight", type=int, default=None)
+    parser.add_argument(
+        "--chunked",
+        action="store_true",
+        help="Summarize long transcripts in parallel chunks",
+    )
+    args = parser.parse_args(argv)
+
+    load_environment()
+    run_batch(
+        args.input,
+        output_root=args.output_dir,
+        fetch_batch_size=args.fetch_batch_size,
+        summarize_workers=args.summarize_workers,
+        render_workers=args.render_workers,
+        max_in_flight=args.max_in_flight,
+        chunked=args.chunked,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,467 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from io import StringIO
+import PIL
+from PIL import Image
+from src.carousel_generator import CarouselGenerator, example_solid_colors
+from src.encoders import PageEncoder
+from src.text_measure import TextMeasurer
+
+short_words = (
+    "the a of to and in is it you that he was for on are as with his they at be "
+    "this have from or one had by word but not what all were we when your can"
+).split()
+# Modules an entry point imports, and dependencies they must leave for later
+import_modules = (
+    "src.carousel_generator",
+    "src.render_queue",
+    "src.content_generator",
+    "src.pipeline",
+    "src.batch",
+)
+heavy_modules = ("pymongo", "langchain", "langchain_google_genai", "dotenv")
+
+long_words = (
+    "performance engineering transcription summarization internationalization "
+    "responsibilities characteristically counterproductive infrastructure "
+    "straightforward understanding notwithstanding representation"
+).split()
+
+
+def synthetic_notes(count, style="short", seed=0):
+    """Notes of 40-50 words each, like the model's output"""
+    rng = random.Random(seed)
+    words = short_words if style == "short" else long_words + short_words[:10]
+    return [" ".join(rng.choices(words, k=rng.randint(40, 50))) for _ in range(count)]
+
+
+def synthetic_transcription(segments, seed=0):
+    """Transcription segments shaped like thread_source_datas documents"""
+    rng = random.Random(seed)
+    return [
+        {
+            "_id": i,
+            "text": " ".join(rng.choices(short_words, k=rng.randint(8, 16))),
+            "start": i * 4.0,
+            "duration": 4.0,
+        }
+        for i in range(segments)
+    ]
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    """Stand-in chat model answering with fixed notes after a delay"""
+
+    model = "fake"
+    temperature = 0.0
+
+    def __init__(self, notes=20, latency=0.0):
+        self.answer = (
+            "```json\n"
+            + json.dumps({"title": "Benchmark title", "notes": synthetic_notes(notes)})
+            + "\n```"
+        )
+        self.latency = latency
+
+    def invoke(self, prompt):
+        time.sleep(self.latency)
+        return FakeResponse(self.answer)
+
+    async def ainvoke(self, prompt):
+        import asyncio
+
+        await asyncio.sleep(self.latency)
+        return FakeResponse(self.answer)
+
+
+def measure(repeat, run=None, setup=None):
+    """Median and best seconds over repeat runs, plus traced peak memory
+
+    Times run(), or the callable returned by setup() so cold caches are
+    rebuilt outside the timed region. Peak memory comes from one extra traced
+    run, since tracing slows everything down. Pillow's image buffers are not
+    traced.
+    """
+    timings = []
+    for _ in range(repeat):
+        stage = setup() if setup else run
+        start = time.perf_counter()
+        stage()
+        timings.append(time.perf_counter() - start)
+
+    stage = setup() if setup else run
+    tracemalloc.start()
+    stage()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "seconds": statistics.median(timings),
+        "best_seconds": min(timings),
+        "peak_bytes": peak,
+    }
+
+
+def fresh_generator():
+    """Generator with a cold text measurement cache"""
+    return CarouselGenerator(measurer=TextMeasurer())
+
+
+def image_config():
+    """Image background config, generating a gradient image once"""
+    path = os.path.join(tempfile.gettempdir(), "carousel_benchmark_background.png")
+    if not os.path.exists(path):
+        Image.linear_gradient("L").resize((1200, 1600)).convert("RGB").save(path)
+    return {"type": "image", "path": path}
+
+
+def render_benchmarks(sizes, styles, repeat):
+    results = {}
+    configs = example_solid_colors()
+    point_font_width = 1080 - 2 * 100 - 80
+
+    for style in styles:
+        for size in sizes:
+            notes = synthetic_notes(size, style)
+            label = f"[{size} {style}]"
+
+            def wrap_setup():
+                generator = fresh_generator()
+                return lambda: [
+                    generator.wrap_text(note, generator.point_font, point_font_width)
+                    for note in notes
+                ]
+
+            def fit_setup():
+                generator = fresh_generator()
+                # The old pagination checked every growing prefix of a page
+                return lambda: [
+                    generator.points_fit_on_page(notes[: i + 1])
+                    for i in range(min(len(notes), 8))
+                ]
+
+            def pages_setup():
+                generator = fresh_generator()
+                return lambda: generator.create_content_pages(notes, configs)
+
+            def points_page_setup():
+                generator = fresh_generator()
+                return lambda: generator.create_points_page(
+                    notes[:4], background_config=configs[1]
+                )
+
+            results["wrap_text" + label] = measure(repeat, setup=wrap_setup)
+            results["points_fit_on_page" + label] = measure(repeat, setup=fit_setup)
+            results["create_content_pages" + label] = measure(repeat, setup=pages_setup)
+            results["create_points_page" + label] = measure(
+                repeat, setup=points_page_setup
+            )
+
+    # Warm caches, the shared atlas keeps its masks between pages
+    for backend in ("freetype", "atlas"):
+        generator = CarouselGenerator(text_backend=backend)
+        for name, config in (("solid", configs[1]), ("image", image_config())):
+            layouts = generator.layout_points(synthetic_notes(4))
+            results[f"draw_points_page[{backend} {name}]"] = measure(
+                repeat,
+                lambda: generator.draw_points_page(layouts, background_config=config),
+            )
+
+    page = fresh_generator().create_points_page(
+        synthetic_notes(4), background_config=configs[1]
+    )
+    for name, encoder in (
+        ("png_save[default]", PageEncoder()),
+        ("png_save[palette]", PageEncoder(palette=True)),
+    ):
+        results[name] = measure(repeat, lambda: encoder.encode(page))
+
+    return results
+
+
+def fetch_benchmarks(repeat, mongo_uri=None, segments=2000):
+    """Time the transcript fetch against mongomock or a local mongod"""
+    try:
+        import src.db as db
+    except ImportError as e:
+        print(f"Skipping fetch benchmark - {e}")
+        return {}
+
+    if mongo_uri:
+        from pymongo import MongoClient
+
+        client = MongoClient(mongo_uri)
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            print("Skipping fetch benchmark - install mongomock or pass --mongo-uri")
+            return {}
+        client = mongomock.MongoClient()
+
+    database = client["carousel_benchmark"]
+    collection = database["thread_source_datas"]
+    collection.delete_many({})
+    urls = [f"https://www.youtube.com/watch?v=bench{i}" for i in range(20)]
+    collection.insert_many(
+        {
+            "source_url": url,
+            "youtube_metadata": {
+                "transcriptions": [
+                    {"transcription": synthetic_transcription(segments, seed=i)}
+                ]
+            },
+        }
+        for i, url in enumerate(urls)
+    )
+    db.db_client, db.db_name = client, "carousel_benchmark"
+    db.ensure_indexes(database)
+
+    results = {
+        f"mongo_fetch[{segments} segments]": measure(
+            repeat, lambda: db.get_thread_source_transcription_in_json(urls[0])
+        ),
+        f"mongo_fetch_bulk[{len(urls)} urls]": measure(
+            repeat, lambda: db.get_transcriptions(urls)
+        ),
+    }
+    collection.drop()
+    return results
+
+
+def summarize_benchmarks(repeat, segments=2000):
+    """Time prompt building and parsing around a zero-latency fake model"""
+    try:
+        from src.content_generator import summarize_transcription
+    except ImportError as e:
+        print(f"Skipping summarize benchmark - {e}")
+        return {}
+
+    transcription = synthetic_transcription(segments)
+    llm = FakeLLM()
+    return {
+        f"summarize[{segments} segments]": measure(
+            repeat,
+            lambda: summarize_transcription(transcription, llm=llm, cache=False),
+        ),
+        f"summarize_chunked[{segments} segments]": measure(
+            repeat,
+            lambda: summarize_transcription(
+                transcription, llm=llm, cache=False, chunked=True, chunk_tokens=2000
+            ),
+        ),
+    }
+
+
+def pipeline_benchmarks(
+    repeat, in_flight=(1, 4, 16), urls=16, latency=0.2, fetch_latency=0.02
+):
+    """Time generate_carousel_for_url over urls with a fake fetch and model
+
+    The fetch and the model only sleep, like a remote Mongo and Gemini, so
+    the stages show how throughput scales with the number of carousels in
+    flight. Rendering is real and runs in the loop's thread pool.
+    """
+    try:
+        import asyncio
+        from src import content_generator
+        from src.pipeline import generate_carousel_for_url
+    except ImportError as e:
+        print(f"Skipping pipeline benchmark - {e}")
+        return {}
+
+    transcription = synthetic_transcription(200)
+    llm = FakeLLM(notes=3, latency=latency)
+
+    async def fetch(url):
+        await asyncio.sleep(fetch_latency)
+        return transcription
+
+    async def generate_all(limit):
+        semaphore = asyncio.Semaphore(limit)
+
+        async def generate(url):
+            async with semaphore:
+                await generate_carousel_for_url(url, llm=llm, cache=False)
+
+        await asyncio.gather(
+            *(
+                generate(f"https://www.youtube.com/watch?v=bench{i}")
+                for i in range(urls)
+            )
+        )
+
+    fetch_transcription = content_generator.aget_thread_source_transcription_in_json
+    content_generator.aget_thread_source_transcription_in_json = fetch
+    try:
+        results = {}
+        for limit in in_flight:
+            result = measure(repeat, lambda: asyncio.run(generate_all(limit)))
+            result["carousels_per_second"] = urls / result["seconds"]
+            results[f"generate_carousel_for_url[{urls} urls, {limit} in flight]"] = (
+                result
+            )
+        return results
+    finally:
+        content_generator.aget_thread_source_transcription_in_json = fetch_transcription
+
+
+def import_time(module):
+    """Cumulative import seconds from -X importtime in a fresh interpreter
+
+    Also returns the heavy dependencies the import pulled in.
+    """
+    code = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {heavy_modules!r} if m in sys.modules))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    microseconds = 0
+    for line in completed.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            microseconds = int(fields[1])
+    loaded = [name for name in completed.stdout.strip().split(",") if name]
+    return microseconds / 1e6, loaded
+
+
+def import_benchmarks(repeat):
+    """Cold import time of each entry module, each in a new interpreter"""
+    results = {}
+    for module in import_modules:
+        try:
+            runs = [import_time(module) for _ in range(repeat)]
+        except subprocess.CalledProcessError as e:
+            print(f"Skipping import benchmark of {module} - {e.stderr.strip()}")
+            continue
+        timings = [seconds for seconds, _ in runs]
+        loaded = runs[0][1]
+        if loaded:
+            print(f"{module} imports {', '.join(loaded)} eagerly")
+        results[f"import[{module}]"] = {
+            "seconds": statistics.median(timings),
+            "best_seconds": min(timings),
+            "peak_bytes": 0,
+            "heavy_imports": loaded,
+        }
+    return results
+
+
+def run_benchmarks(
+    sizes=(10, 100, 500), styles=("short", "long"), repeat=3, mongo_uri=None
+):
+    """Run every benchmark stage and return results with run metadata"""
+    # Rendering prints progress, which is not what is being measured
+    with redirect_stdout(StringIO()):
+        results = render_benchmarks(sizes, styles, repeat)
+    results.update(summarize_benchmarks(repeat))
+    with redirect_stdout(StringIO()):
+        results.update(pipeline_benchmarks(repeat))
+    results.update(fetch_benchmarks(repeat, mongo_uri))
+    results.update(import_benchmarks(repeat))
+
+    return {
+        "meta": {
+            "time": time.time(),
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "machine": platform.machine(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def find_regressions(current, baseline, threshold):
+    """Stages slower than the baseline by more than threshold (0.2 = 20%)"""
+    regressions = []
+    for stage, result in current["results"].items():
+        previous = baseline["results"].get(stage)
+        if previous is None or previous["seconds"] <= 0:
+            continue
+        ratio = result["seconds"] / previous["seconds"]
+        if ratio > 1 + threshold:
+            regressions.append((stage, previous["seconds"], result["seconds"], ratio))
+    return regressions
+
+
+def print_results(report):
+    print(f"{'stage':<45} {'median':>10} {'best':>10} {'peak traced':>12}")
+    for stage, result in report["results"].items():
+        print(
+            f"{stage:<45} {result['seconds'] * 1000:>8.2f}ms "
+            f"{result['best_seconds'] * 1000:>8.2f}ms "
+            f"{result['peak_bytes'] / 1024:>10.0f}KB"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the layout, render, encode, fetch and import paths"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument(
+        "--styles", nargs="+", default=["short", "long"], choices=["short", "long"]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mongo-uri", help="Local mongod instead of mongomock")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this JSON file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed slowdown against the baseline, 0.2 means 20%%",
+    )
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        sizes=args.sizes,
+        styles=args.styles,
+        repeat=args.repeat,
+        mongo_uri=args.mongo_uri,
+    )
+    print_results(report)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = find_regressions(report, baseline, args.threshold)
+        if regressions:
+            print("\nRegressions:")
+            for stage, before, after, ratio in regressions:
+                print(
+                    f"{stage:<45} {before * 1000:.2f}ms -> {after * 1000:.2f}ms "
+                    f"({ratio:.2f}x)"
+                )
+            sys.exit(1)
+        print(f"\nNo stage regressed by more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,17 @@
+import hashlib
 import json
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
+from dataclasses import dataclass
+from PIL import Image, ImageColor, ImageDraw, ImageFont, ImageFilter
 import textwrap
 import os
+from collections import deque
+from src.text_measure import get_measurer
+from src.glyph_atlas import get_glyph_atlas
+from src.background_cache import get_background_cache
+from src.output_sinks import DirectorySink
+from src.encoders import EncodedPage, PageEncoder
+from src.resources import get_resource
+from src.metrics import bytes_buckets, metrics, seconds_buckets
 
 font_path = os.path.join(
     os.path.dirname(__file__), "../Clearface/clearface_serial-bolditalic.otf"
@@ -10,39 +20,97 @@ font_path2 = os.path.join(
     os.path.dirname(__file__), "../Clearface/clearface_serial-regular.otf"
 )
 
+# Bump when drawing changes, so incremental runs re-render every page
+render_version = 1
+
+
+def load_font(path, size):
+    """Load a font once per process and share it"""
+    return get_resource(("font", path, size), lambda: ImageFont.truetype(path, size))
+
+
+def get_carousel_generator(width=1080, height=1920, text_backend="freetype"):
+    """Process-wide generator with warm fonts and caches"""
+    return get_resource(
+        ("carousel_generator", width, height, text_backend),
+        lambda: CarouselGenerator(width, height, text_backend=text_backend),
+    )
+
+
+@dataclass
+class PointLayout:
+    """A point wrapped and measured once for pagination and drawing"""
+
+    number: int
+    lines: list
+    height: int
+    number_width: int
+
+
+@dataclass
+class CarouselPage:
+    """An encoded page handed out by iter_carousel as soon as it is ready"""
+
+    index: int
+    total: int
+    filename: str
+    encoded: EncodedPage
+
+    @property
+    def data(self):
+        return self.encoded.data
+
 
 class CarouselGenerator:
-    def __init__(self, width=1080, height=1920):
+    def __init__(
+        self,
+        width=1080,
+        height=1920,
+        measurer=None,
+        background_cache=None,
+        contrast_mode="page",
+        text_backend="freetype",
+    ):
         # 9:16 aspect ratio for social media posts
         self.width = width
         self.height = height
         self.margin = 100
 
+        # Shared text metrics cache
+        self.measurer = measurer or get_measurer()
+
+        # Shared prepared background images
+        self.background_cache = background_cache or get_background_cache()
+
         # Default colors
         self.default_bg_color = (255, 255, 255)  # White background
         self.light_text_color = (255, 255, 255)  # White text for dark backgrounds
         self.dark_text_color = (30, 30, 30)  # Dark text for light backgrounds
 
+        # "page" picks one text color per page, "line" samples behind each line
+        self.contrast_mode = contrast_mode
+        self._text_color_cache = {}
+
+        # "freetype" rasterizes every draw, "atlas" reuses cached word masks
+        if text_backend not in ("freetype", "atlas"):
+            raise ValueError(f"Unknown text backend {text_backend}")
+        self.text_backend = text_backend
+        self.glyph_atlas = get_glyph_atlas() if text_backend == "atlas" else None
+
         # Load fonts
         self.load_fonts()
 
     def load_fonts(self):
         """Load fonts with fallbacks"""
         try:
-            self.title_font = ImageFont.truetype(font_path, 72)
-            self.point_font = ImageFont.truetype(font_path2, 38)
-            self.number_font = ImageFont.truetype(font_path2, 34)
+            self.title_font = load_font(font_path, 72)
+            self.point_font = load_font(font_path2, 38)
+            self.number_font = load_font(font_path2, 34)
         except:
             try:
-                self.title_font = ImageFont.truetype(
-                    "/System/Library/Fonts/Arial.ttf", 72
-                )
-                self.point_font = ImageFont.truetype(
-                    "/System/Library/Fonts/Arial.ttf", 48
-                )
-                self.number_font = ImageFont.truetype(
-                    "/System/Library/Fonts/Arial.ttf", 44
-                )
+                self.title_font = load_font("/System/Library/Fonts/Arial.ttf", 72)
+                self.point_font = load_font("/System/Library/Fonts/Arial.ttf", 48)
+                self.number_font = load_font("/System/Library/Fonts/Arial.ttf", 44)
             except:
                 self.title_font = ImageFont.load_default()
                 self.point_font = ImageFont.load_default()
@@ -50,111 +118,215 @@ class CarouselGenerator:
 
     def create_solid_background(self, color):
         """Create solid color background"""
+        # Colors loaded from JSON are lists, Pillow only takes tuples
+        if isinstance(color, list):
+            color = tuple(color)
         return Image.new("RGB", (self.width, self.height), color)
 
+    def image_background_key(self, image_path):
+        """Background cache key of an image prepared for this page size"""
+        return (
+            os.path.abspath(image_path),
+            os.path.getmtime(image_path),
+            self.width,
+            self.height,
+        )
+
+    def get_image_background(self, image_path):
+        """Prepared background image from the shared cache, not to be drawn on"""
+        key = self.image_background_key(image_path)
+        bg_img = self.background_cache.get(key)
+        metrics.inc(
+            "carousel_cache_requests_total",
+            cache="background",
+            result="miss" if bg_img is None else "hit",
+        )
+        if bg_img is None:
+            with metrics.span("prepare_background"):
+                bg_img = self.prepare_image_background(image_path)
+            self.background_cache.put(key, bg_img)
+        return bg_img
+
     def create_image_background(self, image_path):
         """Create background from image (9:16 aspect ratio)"""
         try:
-            bg_img = Image.open(image_path).convert("RGB")
-
-            # Resize to fit 9:16 ratio while maintaining aspect ratio
-            img_ratio = bg_img.width / bg_img.height
-            target_ratio = self.width / self.height
-
-            if img_ratio > target_ratio:
-                # Image is wider, fit by height
-                new_height = self.height
-                new_width = int(new_height * img_ratio)
-                bg_img = bg_img.resize(
-                    (new_width, new_height), Image.Resampling.LANCZOS
-                )
-                # Center crop
-                left = (new_width - self.width) // 2
-                bg_img = bg_img.crop((left, 0, left + self.width, self.height))
-            else:
-                # Image is taller, fit by width
-                new_width = self.width
-                new_height = int(new_width / img_ratio)
-                bg_img = bg_img.resize(
-                    (new_width, new_height), Image.Resampling.LANCZOS
-                )
-                # Center crop
-                top = (new_height - self.height) // 2
-                bg_img = bg_img.crop((0, top, self.width, top + self.height))
-
-            return bg_img
+            # Pages draw on their own copy of the cached image
+            return self.get_image_background(image_path).copy()
 
         except Exception as e:
             print(f"Could not load image: {image_path} - {e}")
             print("Using white background instead")
             return self.create_solid_background(self.default_bg_color)
 
-    def get_text_color_for_background(self, background_img):
+    def decode_image_background(self, image_path):
+        """Decoded RGB image, cached once for every page size"""
+        key = (os.path.abspath(image_path), os.path.getmtime(image_path), "source")
+        source = self.background_cache.get(key)
+        if source is None:
+            with Image.open(image_path) as image:
+                source = image.convert("RGB")
+            self.background_cache.put(key, source)
+        return source
+
+    def prepare_image_background(self, image_path):
+        """Load, resize and center crop a background image"""
+        bg_img = self.decode_image_background(image_path)
+
+        # Resize to fit 9:16 ratio while maintaining aspect ratio
+        img_ratio = bg_img.width / bg_img.height
+        target_ratio = self.width / self.height
+
+        if img_ratio > target_ratio:
+            # Image is wider, fit by height
+            new_height = self.height
+            new_width = int(new_height * img_ratio)
+            bg_img = bg_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            # Center crop
+            left = (new_width - self.width) // 2
+            bg_img = bg_img.crop((left, 0, left + self.width, self.height))
+        else:
+            # Image is taller, fit by width
+            new_width = self.width
+            new_height = int(new_width / img_ratio)
+            bg_img = bg_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            # Center crop
+            top = (new_height - self.height) // 2
+            bg_img = bg_img.crop((0, top, self.width, top + self.height))
+
+        return bg_img
+
+    def get_background_brightness(self, background_img, box):
+        """Average (r + g + b) / 3 brightness of a region, computed in C"""
+        region = background_img.crop(box)
+        pixel_count = region.width * region.height
+        if pixel_count == 0:
+            return 255
+
+        # Band histograms are laid out back to back, 256 entries per band
+        histogram = region.histogram()[: 3 * 256]
+        total = sum((i % 256) * count for i, count in enumerate(histogram))
+        return total / (pixel_count * 3)
+
+    def get_text_color_for_background(self, background_img, box=None):
         """Determine best text color based on background brightness"""
-        # Sample center area of background
-        center_crop = background_img.crop(
-            (
+        if box is None:
+            # Sample center area of background
+            box = (
                 self.width // 4,
                 self.height // 4,
                 3 * self.width // 4,
                 3 * self.height // 4,
             )
-        )
 
-        # Calculate average brightness
-        pixels = list(center_crop.getdata())
-        avg_brightness = sum(sum(pixel[:3]) for pixel in pixels) / (len(pixels) * 3)
+        avg_brightness = self.get_background_brightness(background_img, box)
 
         # Return light text for dark backgrounds, dark text for light backgrounds
         return self.light_text_color if avg_brightness < 128 else self.dark_text_color
 
-    def wrap_text(self, text, font, max_width):
-        """Wrap text to fit within max_width"""
-        lines = []
-        words = text.split()
-        current_line = []
+    def background_key(self, background_config):
+        """Hashable identity of a background config, or None if unknown"""
+        if background_config.get("type") == "image":
+            try:
+                path = background_config["path"]
+                mtime = os.path.getmtime(path)
+            except (KeyError, OSError):
+                return None
+            return ("image", os.path.abspath(path), mtime, self.width, self.height)
+
+        color = background_config.get("color", self.default_bg_color)
+        if isinstance(color, list):
+            color = tuple(color)
+        return ("solid", color)
+
+    def get_text_color_for_config(self, background_config, background_img):
+        """Memoized page text color for a background config"""
+        key = self.background_key(background_config)
+        if key is None:
+            return self.get_text_color_for_background(background_img)
+
+        text_color = self._text_color_cache.get(key)
+        if text_color is None:
+            if key[0] == "solid":
+                # Solid colors need no pixel sampling
+                color = key[1]
+                rgb = ImageColor.getrgb(color) if isinstance(color, str) else color
+                if isinstance(rgb, int):
+                    rgb = (rgb, rgb, rgb)
+                avg_brightness = sum(rgb[:3]) / 3
+                text_color = (
+                    self.light_text_color
+                    if avg_brightness < 128
+                    else self.dark_text_color
+                )
+            else:
+                text_color = self.get_text_color_for_background(background_img)
+
+            if len(self._text_color_cache) >= 1024:
+                self._text_color_cache.clear()
+            self._text_color_cache[key] = text_color
+
+        return text_color
+
+    def get_brightness_map(self, background_config, background_img):
+        """Downscaled background for per-line sampling, or None if not needed"""
+        if self.contrast_mode != "line" or background_config.get("type") != "image":
+            return None
+        return background_img.reduce(4)
+
+    def get_line_text_color(self, brightness_map, box, page_text_color):
+        """Text color for the area behind a single line"""
+        if brightness_map is None:
+            return page_text_color
+
+        scaled_box = (
+            max(box[0] // 4, 0),
+            max(box[1] // 4, 0),
+            min(-(-box[2] // 4), brightness_map.width),
+            min(-(-box[3] // 4), brightness_map.height),
+        )
+        return self.get_text_color_for_background(brightness_map, scaled_box)
 
-        for word in words:
-            test_line = " ".join(current_line + [word])
-            bbox = self.get_text_bbox(test_line, font)
-            text_width = bbox[2] - bbox[0]
+    def get_shadow_color(self, text_color):
+        """Shadow color contrasting with the text color"""
+        return (0, 0, 0) if text_color == self.light_text_color else (255, 255, 255)
 
-            if text_width <= max_width:
-                current_line.append(word)
-            else:
-                if current_line:
-                    lines.append(" ".join(current_line))
-                    current_line = [word]
-                else:
-                    lines.append(word)
+    def create_background(self, background_config):
+        """Create page background from a background config"""
+        if background_config.get("type") == "image":
+            return self.create_image_background(background_config["path"])
 
-        if current_line:
-            lines.append(" ".join(current_line))
+        # solid color (default)
+        color = background_config.get("color", self.default_bg_color)
+        return self.create_solid_background(color)
 
-        return lines
+    def wrap_text(self, text, font, max_width):
+        """Wrap text to fit within max_width"""
+        return self.measurer.wrap(text, font, max_width)
 
     def get_text_bbox(self, text, font):
         """Get text bounding box"""
-        img = Image.new("RGB", (1, 1))
-        draw = ImageDraw.Draw(img)
-        return draw.textbbox((0, 0), text, font=font)
+        return self.measurer.bbox(text, font)
 
     def get_text_height(self, text, font):
         """Get text height"""
-        bbox = self.get_text_bbox(text, font)
-        return bbox[3] - bbox[1]
+        return self.measurer.height(text, font)
+
+    def draw_text(self, draw, xy, text, fill, font):
+        """Draw a line of text with the configured backend"""
+        if self.glyph_atlas is not None and self.glyph_atlas.supports(text, font):
+            self.glyph_atlas.draw_text(draw, xy, text, fill, font)
+        else:
+            draw.text(xy, text, fill=fill, font=font)
 
+    @metrics.timed("create_title_page")
     def create_title_page(self, title, background_config):
         """Create title page"""
         # Create background
-        if background_config.get("type") == "image":
-            bg_img = self.create_image_background(background_config["path"])
-        else:  # solid color (default)
-            color = background_config.get("color", self.default_bg_color)
-            bg_img = self.create_solid_background(color)
+        bg_img = self.create_background(background_config)
 
         # Determine text color
-        text_color = self.get_text_color_for_background(bg_img)
+        text_color = self.get_text_color_for_config(background_config, bg_img)
+        brightness_map = self.get_brightness_map(background_config, bg_img)
 
         draw = ImageDraw.Draw(bg_img)
 
@@ -177,152 +349,273 @@ class CarouselGenerator:
             bbox = self.get_text_bbox(line, self.title_font)
             text_width = bbox[2] - bbox[0]
             x = (self.width - text_width) // 2
+            line_color = self.get_line_text_color(
+                brightness_map,
+                (x + bbox[0], current_y + bbox[1], x + bbox[2], current_y + bbox[3]),
+                text_color,
+            )
 
             # Add subtle shadow for better readability if needed
             if background_config.get("type") == "image":
-                shadow_color = (
-                    (0, 0, 0)
-                    if text_color == self.light_text_color
-                    else (255, 255, 255)
-                )
-                draw.text(
+                self.draw_text(
+                    draw,
                     (x + 2, current_y + 2),
                     line,
-                    fill=shadow_color,
-                    font=self.title_font,
+                    self.get_shadow_color(line_color),
+                    self.title_font,
                 )
 
             # Draw main text
-            draw.text((x, current_y), line, fill=text_color, font=self.title_font)
+            self.draw_text(draw, (x, current_y), line, line_color, self.title_font)
             current_y += line_height + 20
 
         return bg_img
 
-    def points_fit_on_page(self, points):
-        """Check if points fit on a single page"""
-        total_height = self.margin  # Top margin
+    def layout_point(self, point, number):
+        """Wrap and measure a single point once"""
         max_text_width = self.width - (2 * self.margin)
+        point_lines = self.wrap_text(point, self.point_font, max_text_width - 80)
+        number_height = self.get_text_height("1.", self.number_font)
+        point_height = len(point_lines) * self.get_text_height("Ay", self.point_font)
+        number_bbox = self.get_text_bbox(f"{number}", self.number_font)
+
+        return PointLayout(
+            number=number,
+            lines=point_lines,
+            height=max(number_height, point_height),
+            number_width=number_bbox[2],
+        )
 
-        for point in points:
-            number_height = self.get_text_height("1.", self.number_font)
-            point_lines = self.wrap_text(point, self.point_font, max_text_width - 80)
-            point_height = len(point_lines) * self.get_text_height(
-                "Ay", self.point_font
-            )
-            item_height = max(number_height, point_height)
-            total_height += item_height + 50  # 50px spacing between points
+    def layout_points(self, points, start_number=1):
+        """Lay out every point, numbering from start_number"""
+        return [
+            self.layout_point(point, start_number + i) for i, point in enumerate(points)
+        ]
 
+    def points_fit_on_page(self, points):
+        """Check if points fit on a single page"""
+        layouts = self.layout_points(points)
+        total_height = self.margin  # Top margin
+        total_height += sum(layout.height + 50 for layout in layouts)
         total_height += self.margin
         return total_height <= self.height
 
-    def create_content_pages(self, key_points, background_configs):
-        """Create pages with key points"""
+    def paginate(self, layouts):
+        """Split laid out points into pages in a single pass"""
         pages = []
-        current_points = []
-        point_index = 0
-        page_index = 0
-
-        while point_index < len(key_points):
-            temp_points = current_points.copy()
-
-            while point_index < len(key_points):
-                temp_points.append(key_points[point_index])
-
-                if self.points_fit_on_page(temp_points):
-                    current_points = temp_points.copy()
-                    point_index += 1
-                else:
-                    temp_points.pop()
-                    break
-
-            if current_points:
-                # Get background config for this page
-                bg_config = background_configs[1]
-
-                page = self.create_points_page(
-                    current_points,
-                    start_number=point_index - len(current_points) + 1,
-                    background_config=bg_config,
-                )
-                pages.append(page)
-                current_points = []
-                page_index += 1
+        current_layouts = []
+        total_height = 2 * self.margin  # Top and bottom margins
+
+        for layout in layouts:
+            item_height = layout.height + 50  # 50px spacing between points
+            if current_layouts and total_height + item_height > self.height:
+                pages.append(current_layouts)
+                current_layouts = []
+                total_height = 2 * self.margin
+
+            # A point taller than a page still gets a page of its own
+            current_layouts.append(layout)
+            total_height += item_height
+
+        if current_layouts:
+            pages.append(current_layouts)
 
         return pages
 
+    def create_content_pages(self, key_points, background_configs):
+        """Create pages with key points"""
+        bg_config = self.content_background_config(background_configs)
+        layouts = self.layout_points(key_points)
+        return [
+            self.draw_points_page(page_layouts, background_config=bg_config)
+            for page_layouts in self.paginate(layouts)
+        ]
+
+    def content_background_config(self, background_configs):
+        """Get background config for content pages"""
+        if len(background_configs) > 1:
+            return background_configs[1]
+        return background_configs[0]
+
+    def plan_pages(self, title, key_points, background_configs, layouts=None):
+        """Plan every page as a (kind, content, background config) spec
+
+        layouts from layout_points may be passed in when another generator of
+        the same width already computed them.
+        """
+        specs = [("title", title, background_configs[0])]
+
+        bg_config = self.content_background_config(background_configs)
+        if layouts is None:
+            with metrics.span("layout", points=len(key_points)):
+                layouts = self.layout_points(key_points)
+        with metrics.span("paginate"):
+            for page_layouts in self.paginate(layouts):
+                specs.append(("points", page_layouts, bg_config))
+
+        return specs
+
+    def renderer_key(self):
+        """Render version, page size, contrast mode and fonts of this generator"""
+        fonts = (self.title_font, self.point_font, self.number_font)
+        return [
+            render_version,
+            (self.width, self.height),
+            self.contrast_mode,
+            [self.measurer.font_identity(font) for font in fonts],
+        ]
+
+    def page_hash(self, spec, encoder):
+        """Content hash of a planned page and everything that changes its file"""
+        kind, content, background_config = spec
+        if kind == "points":
+            content = [(layout.number, layout.lines) for layout in content]
+        identity = {
+            "renderer": self.renderer_key(),
+            "kind": kind,
+            "content": content,
+            "background": self.background_key(background_config) or background_config,
+            "encoder": encoder.settings_key(),
+        }
+        payload = json.dumps(identity, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def render_page(self, spec):
+        """Draw a single planned page"""
+        kind, content, background_config = spec
+        if kind == "title":
+            return self.create_title_page(content, background_config)
+        return self.draw_points_page(content, background_config=background_config)
+
     def create_points_page(self, points, start_number=1, background_config=None):
         """Create a page with key points"""
+        layouts = self.layout_points(points, start_number=start_number)
+        return self.draw_points_page(layouts, background_config=background_config)
+
+    @metrics.timed("draw_points_page")
+    def draw_points_page(self, layouts, background_config=None):
+        """Draw a page from laid out points"""
         # Create background
-        if background_config.get("type") == "image":
-            bg_img = self.create_image_background(background_config["path"])
-        else:  # solid color
-            color = background_config.get("color", self.default_bg_color)
-            bg_img = self.create_solid_background(color)
+        bg_img = self.create_background(background_config)
 
-        text_color = self.get_text_color_for_background(bg_img)
+        text_color = self.get_text_color_for_config(background_config, bg_img)
+        brightness_map = self.get_brightness_map(background_config, bg_img)
         draw = ImageDraw.Draw(bg_img)
 
         current_y = self.margin
-        max_text_width = self.width - (2 * self.margin)
-
-        for i, point in enumerate(points):
-            point_number = start_number + i
+        line_height = self.get_text_height("Ay", self.point_font)
 
+        for layout in layouts:
             # Draw number (no background circle)
-            number_text = f"{point_number}"
-            number_bbox = self.get_text_bbox(number_text, self.number_font)
-
-            number_color = text_color  # Use same as text color
             number_x = self.margin
             number_y = current_y
+            number_color = text_color  # Use same as text color
+            if brightness_map is not None:
+                number_color = self.get_line_text_color(
+                    brightness_map,
+                    (
+                        number_x,
+                        number_y,
+                        number_x + layout.number_width,
+                        number_y + line_height,
+                    ),
+                    text_color,
+                )
 
-            draw.text(
+            self.draw_text(
+                draw,
                 (number_x, number_y),
-                number_text,
-                fill=number_color,
-                font=self.number_font,
+                f"{layout.number}",
+                number_color,
+                self.number_font,
             )
 
             # Draw point text
-            point_lines = self.wrap_text(point, self.point_font, max_text_width - 50)
             point_x = (
-                number_x + number_bbox[2] + 20
+                number_x + layout.number_width + 20
             )  # Indent for point text after number
-
-            line_height = self.get_text_height("Ay", self.point_font)
             text_start_y = current_y
 
-            for j, line in enumerate(point_lines):
+            for j, line in enumerate(layout.lines):
                 line_y = text_start_y + (j * line_height)
+                line_color = text_color
+                if brightness_map is not None:
+                    line_bbox = self.get_text_bbox(line, self.point_font)
+                    line_color = self.get_line_text_color(
+                        brightness_map,
+                        (
+                            point_x + line_bbox[0],
+                            line_y + line_bbox[1],
+                            point_x + line_bbox[2],
+                            line_y + line_bbox[3],
+                        ),
+                        text_color,
+                    )
 
                 # Add shadow for image backgrounds
                 if background_config.get("type") == "image":
-                    shadow_color = (
-                        (0, 0, 0)
-                        if text_color == self.light_text_color
-                        else (255, 255, 255)
-                    )
-                    draw.text(
+                    self.draw_text(
+                        draw,
                         (point_x + 1, line_y + 1),
                         line,
-                        fill=shadow_color,
-                        font=self.point_font,
+                        self.get_shadow_color(line_color),
+                        self.point_font,
                     )
 
-                draw.text(
-                    (point_x, line_y), line, fill=text_color, font=self.point_font
+                self.draw_text(
+                    draw, (point_x, line_y), line, line_color, self.point_font
                 )
 
             # Move to next point position
-            current_y += len(point_lines) * line_height + 50
+            current_y += layout.height + 50
 
         return bg_img
 
     def generate_carousel(
-        self, data, output_dir="carousel_output", background_configs=None
+        self,
+        data,
+        output_dir="carousel_output",
+        background_configs=None,
+        workers=None,
+        sink=None,
+        encoder=None,
+        incremental=False,
+        sizes=None,
     ):
-        """Generate carousel from JSON file"""
-        os.makedirs(output_dir, exist_ok=True)
+        """Generate carousel from JSON file
+
+        Pages are encoded and handed to sink (a DirectorySink for output_dir
+        by default). With an explicit sink, only the page being encoded is
+        held in memory and sink.result() is returned. Without one, the page
+        images are returned, or the saved file paths when workers > 1 renders
+        and encodes pages in a process pool.
+
+        encoder picks the image format and settings (PNG by default). The
+        size and encode time of each page are kept in self.encode_report
+        once the carousel is done.
+
+        With incremental=True the default sink keeps a manifest of page
+        hashes in output_dir. Pages whose hash did not change are neither
+        rendered nor rewritten, and pages left over from a longer previous
+        run are removed. The saved file paths are returned.
+
+        sizes renders the carousel for several (width, height) targets in one
+        run, each in a "{width}x{height}/" folder of the sink. Wrapping is done
+        once per width, fonts, text metrics and decoded backgrounds are
+        shared, and pages of every size are rendered concurrently in a
+        process pool (one worker per CPU unless workers is given).
+        sink.result() is returned.
+        """
+        if sizes:
+            sizes = [tuple(size) for size in sizes]
+            if workers is None:
+                workers = min(os.cpu_count() or 1, len(sizes))
+        parallel = bool(workers and workers > 1)
+        keep_pages = sink is None and not parallel and not incremental and not sizes
+        if sink is None:
+            sink = DirectorySink(output_dir, incremental=incremental)
+        if encoder is None:
+            encoder = PageEncoder()
 
         # with open(json_file_path, "r", encoding="utf-8") as file:
         #     data = json.load(file)
@@ -333,6 +626,113 @@ class CarouselGenerator:
         print(f"Generating carousel for: {title}")
         print(f"Total key points: {len(key_points)}")
 
+        background_configs = self.background_configs_or_default(background_configs)
+
+        with metrics.span("generate_carousel", points=len(key_points)):
+            if sizes:
+                targets = [
+                    (self.for_size(width, height), f"{width}x{height}/")
+                    for width, height in sizes
+                ]
+            else:
+                targets = [(self, "")]
+
+            # Title page first, then content pages, for every target size
+            jobs = []
+            filenames = []
+            layouts_by_width = {}
+            for generator, prefix in targets:
+                layouts = layouts_by_width.get(generator.width)
+                if layouts is None:
+                    with metrics.span("layout", points=len(key_points)):
+                        layouts = generator.layout_points(key_points)
+                    layouts_by_width[generator.width] = layouts
+                page_specs = generator.plan_pages(
+                    title, key_points, background_configs, layouts=layouts
+                )
+                for i, spec in enumerate(page_specs):
+                    jobs.append((generator, spec))
+                    filenames.append(f"{prefix}page_{i + 1:02d}.{encoder.extension}")
+
+            # Sinks with a manifest skip pages they already hold
+            if getattr(sink, "incremental", False):
+                page_hashes = [
+                    generator.page_hash(spec, encoder) for generator, spec in jobs
+                ]
+            else:
+                page_hashes = [None] * len(jobs)
+            changed = [
+                page_hash is None or not sink.has_page(filename, page_hash)
+                for filename, page_hash in zip(filenames, page_hashes)
+            ]
+            changed_jobs = [job for job, is_changed in zip(jobs, changed) if is_changed]
+
+            pages = []
+            # Kept local while rendering, the generator may be shared by threads
+            encode_report = []
+            encoded_pages = self.encode_pages(
+                changed_jobs, encoder, workers, pages if keep_pages else None
+            )
+            for filename, page_hash, is_changed in zip(filenames, page_hashes, changed):
+                if not is_changed:
+                    sink.keep_page(filename, page_hash)
+                    continue
+                encoded = next(encoded_pages)
+                self.save_encoded_page(sink, filename, encoded, encode_report)
+                if page_hash is not None:
+                    sink.record_page(filename, page_hash)
+            sink.close()
+            self.encode_report = encode_report
+
+        print("\nCarousel generated successfully!")
+        print(f"Total pages: {len(jobs)}")
+        if len(changed_jobs) < len(jobs):
+            print(f"Unchanged pages kept: {len(jobs) - len(changed_jobs)}")
+        print(f"Output: {sink}")
+
+        return pages if keep_pages else sink.result()
+
+    def for_size(self, width, height):
+        """Generator for another page size sharing fonts, metrics and caches"""
+        if (width, height) == (self.width, self.height):
+            return self
+        return CarouselGenerator(
+            width,
+            height,
+            measurer=self.measurer,
+            background_cache=self.background_cache,
+            contrast_mode=self.contrast_mode,
+            text_backend=self.text_backend,
+        )
+
+    def iter_carousel(self, data, background_configs=None, workers=None, encoder=None):
+        """Yield each page as a CarouselPage as soon as it is encoded
+
+        The title page comes first. Pages are rendered lazily while the
+        caller consumes them, so rendering serially holds only the current
+        page in memory. With workers > 1 a process pool renders ahead.
+        """
+        if encoder is None:
+            encoder = PageEncoder()
+        page_specs = self.plan_pages(
+            data.get("title", "Untitled"),
+            data.get("notes", []),
+            self.background_configs_or_default(background_configs),
+        )
+
+        jobs = [(self, spec) for spec in page_specs]
+        encoded_pages = self.encode_pages(jobs, encoder, workers)
+        for i, encoded in enumerate(encoded_pages):
+            self.observe_encoded_page(encoded)
+            yield CarouselPage(
+                index=i,
+                total=len(page_specs),
+                filename=f"page_{i + 1:02d}.{encoder.extension}",
+                encoded=encoded,
+            )
+
+    def background_configs_or_default(self, background_configs):
+        """Background configs, or one white background if none are given"""
         # Use default white background if none provided
         if not background_configs:
             background_configs = [
@@ -341,37 +741,121 @@ class CarouselGenerator:
                     "color": (255, 255, 255),
                 },  # White background for all pages
             ]
-
-        pages = []
-
-        # Create title page
-        title_bg_config = (
-            background_configs[0]
-            if background_configs
-            else {"type": "solid", "color": (255, 255, 255)}
+        return background_configs
+
+    def encode_pages(self, jobs, encoder, workers=None, pages=None):
+        """Render and encode (generator, spec) jobs in order
+
+        Pages are rendered one at a time unless workers > 1. Rendered images
+        are appended to pages if it is a list.
+        """
+        if workers and workers > 1:
+            yield from self.render_pages_parallel(jobs, encoder, workers)
+            return
+
+        for generator, spec in jobs:
+            page = generator.render_page(spec)
+            encoded = encoder.encode(page)
+            if pages is not None:
+                pages.append(page)
+            yield encoded
+
+    def save_encoded_page(self, sink, filename, encoded, encode_report):
+        """Write an encoded page to the sink and record its cost"""
+        with metrics.span("save", filename=filename):
+            sink.write(filename, encoded.data)
+
+        self.observe_encoded_page(encoded)
+        encode_report.append(
+            {
+                "filename": filename,
+                "bytes": encoded.size,
+                "encode_seconds": encoded.seconds,
+                "settings": encoded.settings,
+            }
+        )
+        print(
+            f"Saved: {filename} ({encoded.size / 1024:.1f} KB, "
+            f"encoded in {encoded.seconds * 1000:.0f} ms)"
         )
-        title_page = self.create_title_page(title, title_bg_config)
-        pages.append(title_page)
 
-        # Create content pages
-        content_bg_configs = (
-            background_configs if len(background_configs) > 1 else background_configs
+    def observe_encoded_page(self, encoded):
+        """Record the size and encode time of a page in the metrics"""
+        # Encoding may have happened in a worker, so it is observed here
+        metrics.observe(
+            "carousel_stage_seconds", encoded.seconds, seconds_buckets, stage="encode"
+        )
+        metrics.inc("carousel_pages_total")
+        metrics.inc("carousel_page_bytes_total", encoded.size)
+        metrics.observe("carousel_page_bytes", encoded.size, bytes_buckets)
+
+    def render_pages_parallel(self, jobs, encoder, workers):
+        """Render and encode (generator, spec) jobs in a process pool, in order"""
+        # Imported here, multiprocessing is only needed for parallel renders
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Backgrounds are decoded and resized once here, not in every worker
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_seed_background_cache,
+            initargs=(self.prepared_backgrounds(jobs),),
+        ) as executor:
+            # Keep a bounded window of pages in flight
+            pending = deque()
+            for generator, spec in jobs:
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+                pending.append(
+                    executor.submit(
+                        _render_and_encode, generator.worker_settings(), encoder, spec
+                    )
+                )
+            while pending:
+                yield pending.popleft().result()
+
+    def prepared_backgrounds(self, jobs):
+        """Image backgrounds of (generator, spec) jobs, keyed as in the cache"""
+        backgrounds = {}
+        for generator, (_, _, background_config) in jobs:
+            if background_config.get("type") != "image":
+                continue
+            try:
+                path = background_config["path"]
+                key = generator.image_background_key(path)
+                if key not in backgrounds:
+                    backgrounds[key] = generator.get_image_background(path)
+            except Exception:
+                # The worker falls back to a plain background on its own
+                continue
+        return backgrounds
+
+    def worker_settings(self):
+        """Constructor arguments needed to rebuild this generator in a worker"""
+        return (
+            ("width", self.width),
+            ("height", self.height),
+            ("contrast_mode", self.contrast_mode),
+            ("text_backend", self.text_backend),
         )
-        content_pages = self.create_content_pages(key_points, content_bg_configs)
-        pages.extend(content_pages)
 
-        # Save pages
-        for i, page in enumerate(pages):
-            filename = f"page_{i + 1:02d}.png"
-            filepath = os.path.join(output_dir, filename)
-            page.save(filepath, "PNG", quality=95)
-            print(f"Saved: {filename}")
 
-        print("\nCarousel generated successfully!")
-        print(f"Total pages: {len(pages)}")
-        print(f"Output directory: {output_dir}")
+# Generators reused by pool worker processes, keyed by settings
+_worker_generators = {}
 
-        return pages
+
+def _seed_background_cache(backgrounds):
+    """Fill a pool worker's background cache with images prepared by the parent"""
+    cache = get_background_cache()
+    for key, image in backgrounds.items():
+        cache.put(key, image)
+
+
+def _render_and_encode(settings, encoder, spec):
+    """Render a planned page and encode it inside a worker process"""
+    generator = _worker_generators.get(settings)
+    if generator is None:
+        generator = _worker_generators[settings] = CarouselGenerator(**dict(settings))
+    return encoder.encode(generator.render_page(spec))
 
 
 # # Example usage functions
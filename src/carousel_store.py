@@ -0,0 +1,281 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+from src.carousel_generator import get_carousel_generator
+from src.encoders import PageEncoder
+from src.metrics import metrics
+from src.resources import get_resource
+
+default_store_path = os.path.join(os.path.dirname(__file__), "../.cache/carousels")
+default_max_bytes = 1024**3
+
+
+def transcript_hash(transcription):
+    """Hash of the text of transcription segments"""
+    text = "\n".join(segment["text"] for segment in transcription)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def carousel_key(
+    url, transcription, background_configs, width=1080, height=1920, encoder=None
+):
+    """Hash of everything a finished carousel depends on
+
+    That is the URL, the transcript, the backgrounds, the page size, the
+    render version and fonts, and the encoder settings. A new transcript or
+    a font change gives a new key, so stale carousels are never served.
+    """
+    generator = get_carousel_generator(width, height)
+    identity = {
+        "url": url,
+        "transcript": transcript_hash(transcription),
+        "backgrounds": [
+            generator.background_key(config) or config for config in background_configs
+        ],
+        "renderer": generator.renderer_key(),
+        "encoder": (encoder or PageEncoder()).settings_key(),
+    }
+    payload = json.dumps(identity, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskBackend:
+    """Files under a root directory, named by /-separated relative paths"""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.root, *name.split("/"))
+
+    def read(self, name):
+        try:
+            with open(self.path(name), "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, name, data):
+        """Write a file atomically, readers see the old or the new bytes"""
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(data)
+        os.replace(temporary_path, path)
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def delete(self, name):
+        try:
+            os.remove(self.path(name))
+        except FileNotFoundError:
+            pass
+
+    def touch(self, name):
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            pass
+
+    def scan(self, prefix):
+        """Yield (name, size, mtime) of the files under prefix"""
+        top = self.path(prefix)
+        for directory, _, files in os.walk(top):
+            for filename in files:
+                if filename.endswith(".tmp"):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                name = os.path.relpath(path, self.root).replace(os.sep, "/")
+                yield name, stat.st_size, stat.st_mtime
+
+
+class CarouselStore:
+    """Content-addressed cache of finished carousels
+
+    An entry maps a carousel_key to the digests of its ZIP archive and page
+    images, kept once each as blobs, so carousels sharing pages share bytes.
+    Reads refresh an entry's mtime. When the blobs grow past max_bytes, the
+    least recently read entries are dropped along with the blobs only they
+    used.
+    """
+
+    def __init__(self, path=None, max_bytes=None, backend=None):
+        self.backend = backend or DiskBackend(path or default_store_path)
+        self.max_bytes = max_bytes or default_max_bytes
+        self._used = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def entry_name(key):
+        return f"entries/{key}.json"
+
+    @staticmethod
+    def blob_name(digest):
+        return f"blobs/{digest[:2]}/{digest}"
+
+    def get_entry(self, key):
+        data = self.backend.read(self.entry_name(key))
+        if data is None:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            return None
+
+    def has(self, key):
+        return self.backend.exists(self.entry_name(key))
+
+    def get(self, key):
+        """ZIP archive bytes of a stored carousel, or None"""
+        entry = self.get_entry(key)
+        # The archive may have been evicted by another process since
+        zip_data = entry and self.backend.read(self.blob_name(entry["zip"]))
+        metrics.inc(
+            "carousel_cache_requests_total",
+            cache="carousel",
+            result="miss" if zip_data is None else "hit",
+        )
+        if zip_data is None:
+            return None
+        self.backend.touch(self.entry_name(key))
+        return zip_data
+
+    def get_pages(self, key):
+        """(filename, bytes) of the pages of a stored carousel, or None"""
+        entry = self.get_entry(key)
+        if entry is None:
+            return None
+        pages = []
+        for filename, digest in entry["pages"]:
+            data = self.backend.read(self.blob_name(digest))
+            if data is None:
+                return None
+            pages.append((filename, data))
+        return pages
+
+    def get_content(self, key):
+        """Title and notes a stored carousel was rendered from, or None"""
+        entry = self.get_entry(key)
+        return entry and entry.get("content")
+
+    def put(self, key, zip_data, content=None, url=None):
+        """Store a carousel, its pages are read from the ZIP archive"""
+        with zipfile.ZipFile(io.BytesIO(zip_data)) as archive:
+            files = [(name, archive.read(name)) for name in sorted(archive.namelist())]
+
+        pages = []
+        added = self._put_blob(zip_data)
+        zip_digest = hashlib.sha256(zip_data).hexdigest()
+        for filename, data in files:
+            added += self._put_blob(data)
+            pages.append((filename, hashlib.sha256(data).hexdigest()))
+
+        entry = {
+            "zip": zip_digest,
+            "pages": pages,
+            "content": content,
+            "url": url,
+            "created_at": time.time(),
+        }
+        # Written last, so an entry always points at blobs that exist
+        self.backend.write(self.entry_name(key), json.dumps(entry).encode("utf-8"))
+
+        with self._lock:
+            if self._used is None:
+                self._used = self._blob_bytes()
+            else:
+                self._used += added
+            if self._used > self.max_bytes:
+                self._evict(keep=key)
+
+    def _put_blob(self, data):
+        """Write a blob unless it is stored already, returns the bytes added"""
+        name = self.blob_name(hashlib.sha256(data).hexdigest())
+        if self.backend.exists(name):
+            return 0
+        self.backend.write(name, data)
+        return len(data)
+
+    def _blob_bytes(self):
+        return sum(size for _, size, _ in self.backend.scan("blobs"))
+
+    def _evict(self, keep=None):
+        """Drop least recently read entries until the blobs fit in 90% of max_bytes"""
+        entries = []
+        references = {}
+        for name, _, mtime in self.backend.scan("entries"):
+            key = name[len("entries/") : -len(".json")]
+            entry = self.get_entry(key)
+            if entry is None:
+                continue
+            digests = {entry["zip"], *(digest for _, digest in entry["pages"])}
+            for digest in digests:
+                references[digest] = references.get(digest, 0) + 1
+            entries.append((mtime, key, digests))
+
+        sizes = {}
+        recent = set()
+        for name, size, mtime in self.backend.scan("blobs"):
+            digest = name.rsplit("/", 1)[1]
+            sizes[digest] = size
+            if mtime > time.time() - 60:
+                recent.add(digest)
+        used = sum(sizes.values())
+        target = self.max_bytes * 0.9
+        evicted = 0
+        for _, key, digests in sorted(entries):
+            if used <= target:
+                break
+            if key == keep:
+                continue
+            self.backend.delete(self.entry_name(key))
+            evicted += 1
+            for digest in digests:
+                references[digest] -= 1
+                if not references[digest]:
+                    self.backend.delete(self.blob_name(digest))
+                    used -= sizes.pop(digest, 0)
+
+        # Blobs left behind by an interrupted put belong to no entry. Recent
+        # ones may still be waiting for the entry of a put in progress.
+        orphans = [
+            digest
+            for digest in sizes
+            if digest not in references and digest not in recent
+        ]
+        for digest in orphans:
+            self.backend.delete(self.blob_name(digest))
+            used -= sizes.pop(digest)
+
+        self._used = used
+        metrics.inc("carousel_store_evictions_total", evicted)
+
+    def stats(self):
+        entries = sum(1 for _ in self.backend.scan("entries"))
+        return {"entries": entries, "bytes": self._blob_bytes()}
+
+
+def get_carousel_store():
+    """Get the process-wide carousel store
+
+    It is kept at CAROUSEL_STORE_PATH and holds up to CAROUSEL_STORE_MAX_BYTES.
+    """
+
+    def create():
+        max_bytes = os.getenv("CAROUSEL_STORE_MAX_BYTES")
+        return CarouselStore(
+            os.getenv("CAROUSEL_STORE_PATH"), int(max_bytes) if max_bytes else None
+        )
+
+    return get_resource("carousel_store", create)
@@ -1,17 +1,18 @@
-from src.db import get_thread_source_transcription_in_json
-from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
+from src.db import (
+    aget_thread_source_transcription_in_json,
+    get_thread_source_transcription_in_json,
+)
+from src.summary_cache import get_summary_cache, summary_key
+from src.resources import get_resource, load_environment
+from src.metrics import metrics
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import json
 
-load_dotenv()
+model_name = "gemini-1.5-flash"
+temperature = 0.5
 
-
-def content_generator(url: str):
-    llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.5)
-    transcripitons = get_thread_source_transcription_in_json(url)
-    text1 = " ".join([transcription["text"] for transcription in transcripitons])
-
-    prompt = f"""
+prompt_template = """
     You are an expert writer who provides consise and accurate notes from a transcription of a youtube video.
     You will be given a transcripiton of a youtube video, using that create a title and concise point wise notes. Use simple text format, not the markdown format.
     Each point should contain maximum of 40-50 words.
@@ -26,11 +27,304 @@ def content_generator(url: str):
     ]
     }}
     Here is the transcription of the video:
-    {text1}
+    {transcription}
     Here are the concise notes:
     """
-    response = llm.invoke(prompt)
-    json_response = json.loads(
-        str(response.content.strip().strip("```").strip("```json"))
+
+chunk_prompt_template = """
+    You are an expert writer who provides consise and accurate notes from a transcription of a youtube video.
+    You will be given one part of the transcription of a youtube video{position}. Using that part, create a short title for it and concise point wise notes. Use simple text format, not the markdown format.
+    Each point should contain maximum of 40-50 words.
+    Write only the important points no fluff. Try to include exact wordings inside double quote if something informative has been said.
+    The output must be in json format starting and trailing  with triple backtics.
+    {{
+    "title": "Title of this part",
+    "notes": [
+        "Point 1",
+        "Point 2"
+    ]
+    }}
+    Here is the part of the transcription:
+    {transcription}
+    Here are the concise notes:
+    """
+
+merge_prompt_template = """
+    You are an expert writer who provides consise and accurate notes from a transcription of a youtube video.
+    You will be given notes written for consecutive parts of one youtube video, in order. Merge them into one title for the whole video and one list of concise point wise notes. Remove repeated points and keep the order of the video. Use simple text format, not the markdown format.
+    Each point should contain maximum of 40-50 words.
+    Keep exact wordings inside double quote where the notes have them.
+    The output must be in json format starting and trailing  with triple backtics.
+    {{
+    "title": "Title of the video",
+    "notes": [
+        "Point 1",
+        "Point 2",
+        "Point 3"
+    ]
+    }}
+    Here are the notes of each part:
+    {partial_notes}
+    Here are the merged concise notes:
+    """
+
+# Segment keys that may hold a start time in seconds
+timestamp_keys = ("start", "offset", "start_time", "timestamp")
+
+
+def estimate_tokens(text: str):
+    """Rough token count, about four characters per token"""
+    return len(text) // 4 + 1
+
+
+def segment_start(segment):
+    """Start time of a transcription segment in seconds, if it has one"""
+    for key in timestamp_keys:
+        value = segment.get(key)
+        if isinstance(value, (int, float)):
+            return float(value)
+    return None
+
+
+def format_timestamp(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+def split_transcription(transcriptions, max_tokens=6000):
+    """Split segments into consecutive windows of at most max_tokens each"""
+    windows = []
+    current_window = []
+    current_tokens = 0
+
+    for segment in transcriptions:
+        segment_tokens = estimate_tokens(segment["text"])
+        if current_window and current_tokens + segment_tokens > max_tokens:
+            windows.append(current_window)
+            current_window = []
+            current_tokens = 0
+        current_window.append(segment)
+        current_tokens += segment_tokens
+
+    if current_window:
+        windows.append(current_window)
+
+    return windows
+
+
+def window_position(window, index, total):
+    """Describe where a window sits in the video for the chunk prompt"""
+    position = f" (part {index + 1} of {total}"
+    start = segment_start(window[0])
+    end = segment_start(window[-1])
+    if start is not None and end is not None:
+        position += f", from {format_timestamp(start)} to {format_timestamp(end)}"
+    return position + ")"
+
+
+def chunk_prompt(window, index, total):
+    return chunk_prompt_template.format(
+        position=window_position(window, index, total),
+        transcription=" ".join(segment["text"] for segment in window),
+    )
+
+
+def merge_prompt(partial_summaries):
+    partial_notes = "\n".join(
+        json.dumps(
+            {"part": i + 1, "title": summary["title"], "notes": summary["notes"]},
+            ensure_ascii=False,
+        )
+        for i, summary in enumerate(partial_summaries)
     )
+    return merge_prompt_template.format(partial_notes=partial_notes)
+
+
+def summarize_chunks(llm, windows, max_concurrency=4):
+    """Summarize every window concurrently, returning results in order"""
+
+    def summarize(indexed_window):
+        index, window = indexed_window
+        prompt = chunk_prompt(window, index, len(windows))
+        return parse_response(llm.invoke(prompt).content)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        return list(executor.map(summarize, enumerate(windows)))
+
+
+def merge_chunk_summaries(llm, partial_summaries):
+    """Merge per-window notes into the final title and notes"""
+    if len(partial_summaries) == 1:
+        return partial_summaries[0]
+
+    return parse_response(llm.invoke(merge_prompt(partial_summaries)).content)
+
+
+async def asummarize_chunks(llm, windows, max_concurrency=4):
+    """Async version of summarize_chunks, bounded by a semaphore"""
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def summarize(index, window):
+        async with semaphore:
+            response = await llm.ainvoke(chunk_prompt(window, index, len(windows)))
+        return parse_response(response.content)
+
+    return await asyncio.gather(
+        *(summarize(index, window) for index, window in enumerate(windows))
+    )
+
+
+async def amerge_chunk_summaries(llm, partial_summaries):
+    """Async version of merge_chunk_summaries"""
+    if len(partial_summaries) == 1:
+        return partial_summaries[0]
+
+    response = await llm.ainvoke(merge_prompt(partial_summaries))
+    return parse_response(response.content)
+
+
+def parse_response(content: str):
+    """Parse the model's fenced JSON answer"""
+    return json.loads(str(content.strip().strip("```").strip("```json")))
+
+
+def create_llm():
+    """Process-wide Gemini chat model"""
+
+    def create():
+        # LangChain takes seconds to import, only pay for it when summarizing
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        load_environment()
+        return ChatGoogleGenerativeAI(model=model_name, temperature=temperature)
+
+    return get_resource(("llm", model_name, temperature), create)
+
+
+def content_cache_key(text1, llm, chunked, chunk_tokens):
+    """Summary cache key for a transcript and the settings that summarize it"""
+    if chunked:
+        template_key = (chunk_prompt_template, merge_prompt_template, chunk_tokens)
+    else:
+        template_key = prompt_template
+    return summary_key(text1, template_key, *model_identity(llm))
+
+
+def model_identity(llm):
+    """Model name and temperature of llm, the default model's if it is None
+
+    A model without a model attribute, like a test double, is named by its
+    type, so its answers never land under the default model's cache keys.
+    The Gemini client reports its model as "models/<name>", the prefix is
+    dropped so create_llm() and llm=None share cached summaries.
+    """
+    if llm is None:
+        return model_name, temperature
+    name = getattr(llm, "model", None)
+    if name is None:
+        name = f"{type(llm).__module__}.{type(llm).__qualname__}"
+    elif isinstance(name, str) and name.startswith("models/"):
+        name = name[len("models/") :]
+    return name, getattr(llm, "temperature", None)
+
+
+def record_cache_result(cached_response):
+    metrics.inc(
+        "carousel_cache_requests_total",
+        cache="summary",
+        result="miss" if cached_response is None else "hit",
+    )
+
+
+def content_generator(url: str, **options):
+    """Summarize a video's transcription into a title and notes
+
+    options are passed to summarize_transcription.
+    """
+    transcripitons = get_thread_source_transcription_in_json(url)
+    return summarize_transcription(transcripitons, **options)
+
+
+def summarize_transcription(
+    transcripitons,
+    llm=None,
+    cache=None,
+    chunked=False,
+    chunk_tokens=6000,
+    max_concurrency=4,
+):
+    """Summarize transcription segments into a title and notes
+
+    llm defaults to a Gemini chat model and is only created on a cache miss.
+    cache defaults to the shared summary cache, pass False to bypass it.
+    With chunked=True the transcription is split into windows of about
+    chunk_tokens, summarized with up to max_concurrency parallel calls and
+    merged with one final call.
+    """
+    text1 = " ".join([transcription["text"] for transcription in transcripitons])
+
+    if cache is None:
+        cache = get_summary_cache()
+    key = content_cache_key(text1, llm, chunked, chunk_tokens)
+    if cache:
+        cached_response = cache.get(key)
+        record_cache_result(cached_response)
+        if cached_response is not None:
+            return cached_response
+
+    if llm is None:
+        llm = create_llm()
+    with metrics.span("summarize", chunked=chunked):
+        if chunked:
+            windows = split_transcription(transcripitons, max_tokens=chunk_tokens)
+            partial_summaries = summarize_chunks(llm, windows, max_concurrency)
+            json_response = merge_chunk_summaries(llm, partial_summaries)
+        else:
+            prompt = prompt_template.format(transcription=text1)
+            response = llm.invoke(prompt)
+            json_response = parse_response(response.content)
+
+    if cache:
+        cache.put(key, json_response)
+    return json_response
+
+
+async def acontent_generator(
+    url: str,
+    llm=None,
+    cache=None,
+    chunked=False,
+    chunk_tokens=6000,
+    max_concurrency=4,
+):
+    """Async version of content_generator using the async Mongo client and ainvoke"""
+    transcripitons = await aget_thread_source_transcription_in_json(url)
+    text1 = " ".join([transcription["text"] for transcription in transcripitons])
+
+    if cache is None:
+        cache = get_summary_cache()
+    key = content_cache_key(text1, llm, chunked, chunk_tokens)
+    if cache:
+        cached_response = await asyncio.to_thread(cache.get, key)
+        record_cache_result(cached_response)
+        if cached_response is not None:
+            return cached_response
+
+    if llm is None:
+        llm = create_llm()
+    with metrics.span("summarize", chunked=chunked):
+        if chunked:
+            windows = split_transcription(transcripitons, max_tokens=chunk_tokens)
+            partial_summaries = await asummarize_chunks(llm, windows, max_concurrency)
+            json_response = await amerge_chunk_summaries(llm, partial_summaries)
+        else:
+            prompt = prompt_template.format(transcription=text1)
+            response = await llm.ainvoke(prompt)
+            json_response = parse_response(response.content)
+
+    if cache:
+        await asyncio.to_thread(cache.put, key, json_response)
     return json_response
@@ -1,53 +1,189 @@
 import os
-from pymongo import MongoClient
-from dotenv import load_dotenv
-
-load_dotenv()
+import threading
+from src.metrics import metrics
+from src.resources import load_environment
 
+# pymongo is imported by the client factories, rendering never needs it
 db_client = None
-db_name = os.getenv("MONGO_DB_NAME")
+# Read from MONGO_DB_NAME when the first client is created
+db_name = None
 db_async_client = None
+_client_lock = threading.Lock()
+
+
+def client_options():
+    """Connection pool and timeout settings for the shared client"""
+    return {
+        "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+        "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+        "serverSelectionTimeoutMS": int(
+            os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")
+        ),
+        "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+        "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000")),
+    }
+
+
+def database_name():
+    """MONGO_DB_NAME, read once the environment is loaded"""
+    global db_name
+    if db_name is None:
+        db_name = os.getenv("MONGO_DB_NAME")
+    return db_name
+
 
+def get_db(**options):
+    """Get the database, creating the shared client on first use
 
-def get_db():
+    Keyword options override client_options for the first call only.
+    """
     try:
         global db_client
         if db_client is None:
-            db_client = MongoClient(os.getenv("MONGO_DB_URI"))
-        return db_client[db_name]
+            with _client_lock:
+                if db_client is None:
+                    from pymongo import MongoClient
+
+                    load_environment()
+                    client = MongoClient(
+                        os.getenv("MONGO_DB_URI"), **{**client_options(), **options}
+                    )
+                    ensure_indexes(client[database_name()])
+                    db_client = client
+        return db_client[database_name()]
     except Exception as database_error:
-        raise ValueError(
-            status_code=400,
-            detail="Error When Connecting to Databse",
-        ) from database_error
+        raise ValueError("Error when connecting to database") from database_error
+
+
+async def get_async_db(**options):
+    """Get the database through the shared asyncio client
+
+    Keyword options override client_options for the first call only.
+    """
+    try:
+        global db_async_client
+        if db_async_client is None:
+            from pymongo import AsyncMongoClient
+
+            load_environment()
+            db_async_client = AsyncMongoClient(
+                os.getenv("MONGO_DB_URI"), **{**client_options(), **options}
+            )
+            await async_ensure_indexes(db_async_client[database_name()])
+        return db_async_client[database_name()]
+    except Exception as database_error:
+        raise ValueError("Error when connecting to database") from database_error
+
+
+def ensure_indexes(db):
+    """Create the indexes the transcript lookups rely on"""
+    try:
+        db["thread_source_datas"].create_index("source_url")
+    except Exception as e:
+        print(f"Could not create index on source_url - {e}")
+
+
+async def async_ensure_indexes(db):
+    """Create the indexes the transcript lookups rely on"""
+    try:
+        await db["thread_source_datas"].create_index("source_url")
+    except Exception as e:
+        print(f"Could not create index on source_url - {e}")
+
+
+def transcription_pipeline(match, limit=None, sort=None, fields=()):
+    """Aggregation returning only the first transcription's segments
 
+    fields are extra top-level fields kept next to source_url.
+    """
+    pipeline = [{"$match": match}]
+    if sort is not None:
+        pipeline.append({"$sort": sort})
+    if limit is not None:
+        pipeline.append({"$limit": limit})
+    projection = {
+        "_id": 0,
+        "source_url": 1,
+        "transcription": {
+            "$arrayElemAt": [
+                "$youtube_metadata.transcriptions.transcription",
+                0,
+            ]
+        },
+    }
+    projection.update((field, 1) for field in fields)
+    return pipeline + [
+        {"$project": projection},
+        # Segment ids are dropped by the server instead of in Python
+        {"$project": {"transcription._id": 0}},
+    ]
 
+
+@metrics.timed("mongo_fetch")
 def get_thread_source_transcription_in_json(url: str):
     try:
         db = get_db()
         thread_source_collection = db["thread_source_datas"]
-        # print(url)
-        thread_source_doc = thread_source_collection.find_one({"source_url": url})
-        # print(thread_source_doc)
-        if not thread_source_doc:
-            raise ValueError(f"Document with id {url} not found")
-
-        if (
-            thread_source_doc["youtube_metadata"] is None
-            or thread_source_doc["youtube_metadata"]["transcriptions"] is None
-            or len(thread_source_doc["youtube_metadata"]["transcriptions"]) == 0
-        ):
-            raise ValueError(f"Document with id {url} does not have transcriptions")
-
-        json_data = thread_source_doc["youtube_metadata"]["transcriptions"][0][
-            "transcription"
-        ]
-        for dictionary in json_data:
-            del dictionary["_id"]
-        return json_data
+        pipeline = transcription_pipeline({"source_url": url}, limit=1)
+        thread_source_doc = next(thread_source_collection.aggregate(pipeline), None)
+        return first_transcription(thread_source_doc, url)
+
+    except Exception as e:
+        print(e)
+        raise ValueError(
+            f"Some error occured while fetching transcription for document {url}"
+        )
+
+
+async def aget_thread_source_transcription_in_json(url: str):
+    """Async version of get_thread_source_transcription_in_json"""
+    try:
+        with metrics.span("mongo_fetch"):
+            db = await get_async_db()
+            thread_source_collection = db["thread_source_datas"]
+            pipeline = transcription_pipeline({"source_url": url}, limit=1)
+            cursor = await thread_source_collection.aggregate(pipeline)
+            documents = await cursor.to_list(length=1)
+        thread_source_doc = documents[0] if documents else None
+        return first_transcription(thread_source_doc, url)
 
     except Exception as e:
         print(e)
         raise ValueError(
             f"Some error occured while fetching transcription for document {url}"
         )
+
+
+def first_transcription(thread_source_doc, url):
+    """Segments of a projected document, raising if there are none"""
+    if not thread_source_doc:
+        raise ValueError(f"Document with id {url} not found")
+
+    json_data = thread_source_doc.get("transcription")
+    if not json_data:
+        raise ValueError(f"Document with id {url} does not have transcriptions")
+
+    return json_data
+
+
+@metrics.timed("mongo_fetch_bulk")
+def get_transcriptions(urls):
+    """Fetch the first transcription for many URLs in one round trip
+
+    Returns a dict mapping each found URL to its segments. URLs without a
+    document or without transcriptions are left out.
+    """
+    try:
+        db = get_db()
+        thread_source_collection = db["thread_source_datas"]
+        pipeline = transcription_pipeline({"source_url": {"$in": list(urls)}})
+
+        transcriptions = {}
+        for doc in thread_source_collection.aggregate(pipeline):
+            if doc.get("transcription") and doc["source_url"] not in transcriptions:
+                transcriptions[doc["source_url"]] = doc["transcription"]
+        return transcriptions
+
+    except Exception as e:
+        print(e)
+        raise ValueError("Some error occured while fetching transcriptions")
@@ -0,0 +1,156 @@
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from PIL import Image, ImageChops
+
+FORMAT_EXTENSIONS = {"PNG": "png", "WEBP": "webp", "JPEG": "jpg"}
+
+
+@dataclass
+class EncodedPage:
+    """Encoded page bytes with what it cost to produce them"""
+
+    data: bytes
+    extension: str
+    seconds: float
+    settings: dict
+
+    @property
+    def size(self):
+        return len(self.data)
+
+
+class PageEncoder:
+    """Encode page images to PNG, WebP or JPEG, optionally within a size budget"""
+
+    def __init__(
+        self,
+        format="PNG",
+        compress_level=6,
+        optimize=False,
+        lossless=True,
+        quality=90,
+        min_quality=40,
+        max_bytes=None,
+        palette=False,
+    ):
+        format = format.upper().replace("JPG", "JPEG")
+        if format not in FORMAT_EXTENSIONS:
+            raise ValueError(f"Unsupported image format: {format}")
+
+        self.format = format
+        self.compress_level = compress_level
+        self.optimize = optimize
+        # JPEG has no lossless mode
+        self.lossless = lossless and format != "JPEG"
+        self.quality = quality
+        self.min_quality = min_quality
+        self.max_bytes = max_bytes
+        # Opt-in: PNG pages with at most 256 colors are saved as exact
+        # palette images, about half the bytes but three times the encode
+        # time, since only median cut quantizes them without loss
+        self.palette = palette
+
+    @property
+    def extension(self):
+        return FORMAT_EXTENSIONS[self.format]
+
+    def encode(self, page):
+        """Encode a page, searching settings when a byte budget is set"""
+        start = time.perf_counter()
+        page = self.prepare(page)
+
+        settings = self.base_settings()
+        data = self.save(page, settings)
+        if self.max_bytes is not None and len(data) > self.max_bytes:
+            data, settings = self.fit_budget(page, data, settings)
+
+        return EncodedPage(
+            data=data,
+            extension=self.extension,
+            seconds=time.perf_counter() - start,
+            settings=settings,
+        )
+
+    def prepare(self, page):
+        """Convert pages with few colors to an exact palette image"""
+        if self.format != "PNG" or not self.palette or page.mode != "RGB":
+            return page
+
+        colors = page.getcolors(maxcolors=256)
+        if colors is None:
+            return page
+
+        # Median cut with a box per color keeps every color exactly
+        quantized = page.quantize(
+            colors=len(colors),
+            method=Image.Quantize.MEDIANCUT,
+            dither=Image.Dither.NONE,
+        )
+        if ImageChops.difference(page, quantized.convert("RGB")).getbbox():
+            return page
+        return quantized
+
+    def settings_key(self):
+        """Every setting that can change the encoded bytes"""
+        return sorted(vars(self).items())
+
+    def base_settings(self):
+        if self.format == "PNG":
+            return {
+                "compress_level": self.compress_level,
+                "optimize": self.optimize,
+            }
+        if self.format == "WEBP" and self.lossless:
+            return {"lossless": True, "quality": self.quality, "method": 4}
+        if self.format == "WEBP":
+            return {"quality": self.quality, "method": 4}
+        return {"quality": self.quality, "optimize": self.optimize}
+
+    def save(self, page, settings):
+        buffer = BytesIO()
+        page.save(buffer, self.format, **settings)
+        return buffer.getvalue()
+
+    def fit_budget(self, page, data, settings):
+        """Find the best settings that fit max_bytes, else the smallest output"""
+        best = (data, settings)
+
+        if self.format == "PNG" or self.lossless:
+            # Squeeze harder without losing anything first
+            if self.format == "PNG":
+                strongest = {"compress_level": 9, "optimize": True}
+            else:
+                strongest = {"lossless": True, "quality": 100, "method": 6}
+            candidate = self.save(page, strongest)
+            if len(candidate) < len(best[0]):
+                best = (candidate, strongest)
+            if len(best[0]) <= self.max_bytes or self.lossless:
+                return best
+
+            if self.format == "PNG":
+                # Lossy palette reduction is the last resort for PNG
+                reduced = page.convert("RGB").quantize(colors=256)
+                candidate = self.save(reduced, strongest)
+                if len(candidate) < len(best[0]):
+                    best = (candidate, dict(strongest, quantized=True))
+                return best
+
+        # Binary search for the highest quality that fits
+        low, high = self.min_quality, self.quality
+        smallest = best
+        fitting = None
+        while low <= high:
+            quality = (low + high) // 2
+            trial_settings = dict(self.base_settings(), quality=quality)
+            trial_settings.pop("lossless", None)
+            candidate = self.save(page, trial_settings)
+            if len(candidate) < len(smallest[0]):
+                smallest = (candidate, trial_settings)
+            if len(candidate) <= self.max_bytes:
+                fitting = (candidate, trial_settings)
+                low = quality + 1
+            else:
+                high = quality - 1
+
+        return fitting or smallest
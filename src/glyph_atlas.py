@@ -0,0 +1,79 @@
+import math
+from PIL import Image, ImageFont
+from src.text_measure import get_measurer
+
+
+class GlyphAtlas:
+    """Rasterized text masks cached per (font, size), drawn without FreeType
+
+    Masks are cached per word and subpixel phase. FreeType renders each word
+    once, so kerning inside a word is its own. Words are placed at the
+    cumulative advances the measurer already uses for line breaking, which
+    are additive across spaces. A shadow pass reuses the masks of the text.
+    """
+
+    def __init__(self, measurer=None, max_entries_per_font=8192):
+        self.measurer = measurer or get_measurer()
+        self.max_entries_per_font = max_entries_per_font
+        self._masks = {}
+
+    def supports(self, text, font):
+        """Check if text can be drawn from cached masks"""
+        return isinstance(font, ImageFont.FreeTypeFont) and "\n" not in text
+
+    def word_mask(self, word, font, phase):
+        """Mask and (x, y) offset of a word starting phase/64 px into a pixel"""
+        key = self.measurer.font_key(font)
+        cache = self._masks.get(key)
+        if cache is None:
+            cache = self._masks[key] = {}
+        elif len(cache) >= self.max_entries_per_font:
+            cache.clear()
+
+        entry = cache.get((word, phase))
+        if entry is None:
+            mask, offset = font.getmask2(word, "L", start=(phase / 64, 0))
+            image = (
+                Image.frombytes("L", mask.size, bytes(mask)) if mask.size[0] else None
+            )
+            entry = cache[(word, phase)] = (image, offset)
+        return entry
+
+    def draw_text(self, draw, xy, text, fill, font):
+        """Draw a single line like ImageDraw.text at integer coordinates"""
+        x, y = xy
+        space = self.measurer.length(" ", font)
+        pen = 0.0
+        for i, word in enumerate(text.split(" ")):
+            if i:
+                pen += space
+            if not word:
+                continue
+            whole = math.floor(pen)
+            mask, offset = self.word_mask(word, font, round((pen - whole) * 64))
+            if mask is not None:
+                draw.bitmap((x + whole + offset[0], y + offset[1]), mask, fill=fill)
+            pen += self.measurer.length(word, font)
+
+    def clear(self):
+        self._masks.clear()
+
+    def stats(self):
+        return {
+            "fonts": len(self._masks),
+            "entries": sum(len(cache) for cache in self._masks.values()),
+            "bytes": sum(
+                mask.width * mask.height
+                for cache in self._masks.values()
+                for mask, _ in cache.values()
+                if mask is not None
+            ),
+        }
+
+
+_shared_atlas = GlyphAtlas()
+
+
+def get_glyph_atlas():
+    """Get the process-wide glyph atlas"""
+    return _shared_atlas
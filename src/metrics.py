@@ -0,0 +1,253 @@
+import contextvars
+import functools
+import os
+import random
+import threading
+import time
+from collections import deque
+
+seconds_buckets = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+bytes_buckets = tuple(1024 * size for size in (16, 64, 128, 256, 512, 1024, 2048, 4096))
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class _NoopSpan:
+    """Span used while metrics are disabled, it does nothing"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+
+_noop_span = _NoopSpan()
+
+
+class Span:
+    """Timed stage that feeds the stage histogram and, when tracing, the span log"""
+
+    def __init__(self, metrics, name, attributes):
+        self.metrics = metrics
+        self.name = name
+        self.attributes = attributes
+        self.parent = None
+        self.trace_id = None
+        self.span_id = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.parent = _current_span.get()
+        self.trace_id = (
+            self.parent.trace_id if self.parent else f"{random.getrandbits(128):032x}"
+        )
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self._token = _current_span.set(self)
+        self.start_time_ns = time.time_ns()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        seconds = time.perf_counter() - self._start
+        _current_span.reset(self._token)
+
+        status = "ERROR" if exc_type else "OK"
+        self.metrics.observe(
+            "carousel_stage_seconds", seconds, seconds_buckets, stage=self.name
+        )
+        if exc_type:
+            self.metrics.inc("carousel_stage_errors_total", stage=self.name)
+
+        if self.metrics.tracing:
+            self.metrics.record_span(
+                {
+                    "name": self.name,
+                    "trace_id": self.trace_id,
+                    "span_id": self.span_id,
+                    "parent_span_id": self.parent.span_id if self.parent else None,
+                    "start_time_unix_nano": self.start_time_ns,
+                    "end_time_unix_nano": self.start_time_ns + int(seconds * 1e9),
+                    "attributes": self.attributes,
+                    "status": status,
+                }
+            )
+        return False
+
+
+class Metrics:
+    """Counters, histograms and optional spans, exported in Prometheus text format"""
+
+    def __init__(self, enabled=False, tracing=False, max_spans=1000):
+        self.enabled = enabled
+        self.tracing = tracing
+        self.spans = deque(maxlen=max_spans)
+        self.span_exporters = []
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def enable(self, tracing=False):
+        self.enabled = True
+        self.tracing = tracing
+
+    def configure_from_env(self):
+        """Turn on metrics with CAROUSEL_METRICS=1 and spans with CAROUSEL_TRACING=1
+
+        Called again once .env is loaded. Flags that are not set leave the
+        current state alone, so an explicit enable() is kept.
+        """
+        if os.getenv("CAROUSEL_METRICS") == "1":
+            self.enabled = True
+        if os.getenv("CAROUSEL_TRACING") == "1":
+            self.tracing = True
+
+    def disable(self):
+        self.enabled = False
+        self.tracing = False
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.spans.clear()
+
+    def inc(self, name, value=1, **labels):
+        """Add to a counter"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=seconds_buckets, **labels):
+        """Record a value in a histogram"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {
+                    "buckets": buckets,
+                    "counts": [0] * len(buckets),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram["counts"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def span(self, name, **attributes):
+        """Context manager timing a pipeline stage"""
+        if not self.enabled:
+            return _noop_span
+        return Span(self, name, attributes)
+
+    def timed(self, name):
+        """Decorator timing every call of a function as a stage"""
+
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with Span(self, name, {}):
+                    return function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def record_span(self, span):
+        self.spans.append(span)
+        for exporter in self.span_exporters:
+            try:
+                exporter(span)
+            except Exception as e:
+                print(f"Span exporter failed - {e}")
+
+    def add_span_exporter(self, exporter):
+        """Call exporter(span_dict) for every finished span while tracing"""
+        self.span_exporters.append(exporter)
+
+    def render_prometheus(self):
+        """All counters and histograms in Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), histogram in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            for bound, count in zip(histogram["buckets"], histogram["counts"]):
+                bucket_labels = labels + (("le", _format_number(bound)),)
+                lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {count}")
+            inf_labels = labels + (("le", "+Inf"),)
+            lines.append(
+                f"{name}_bucket{_format_labels(inf_labels)} {histogram['count']}"
+            )
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in labels
+    )
+    return "{" + pairs + "}"
+
+
+# Enabled with CAROUSEL_METRICS=1, spans kept with CAROUSEL_TRACING=1
+metrics = Metrics()
+metrics.configure_from_env()
+
+
+def serve_metrics(port=9108, host="127.0.0.1"):
+    """Serve /metrics in Prometheus format from a background thread
+
+    Only local scrapers can reach it by default, pass host="0.0.0.0" to
+    listen on every interface.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,139 @@
+import json
+import os
+import zipfile
+from io import BytesIO
+
+
+class DirectorySink:
+    """Write encoded pages as files in a directory
+
+    An incremental sink remembers the hash of every page in manifest.json,
+    so unchanged pages can be kept from the previous run.
+    """
+
+    manifest_name = "manifest.json"
+
+    def __init__(self, output_dir="carousel_output", incremental=False):
+        self.output_dir = output_dir
+        self.filepaths = []
+        self.incremental = incremental
+        self.page_hashes = {}
+        os.makedirs(output_dir, exist_ok=True)
+        self.previous_hashes = self.load_manifest() if incremental else {}
+
+    def load_manifest(self):
+        """Page hashes of the previous run, empty if there is no manifest"""
+        try:
+            with open(self.manifest_path(), "r", encoding="utf-8") as file:
+                return json.load(file)["pages"]
+        except (OSError, ValueError, KeyError) as e:
+            if os.path.exists(self.manifest_path()):
+                print(f"Ignoring unreadable manifest - {e}")
+            return {}
+
+    def manifest_path(self):
+        return os.path.join(self.output_dir, self.manifest_name)
+
+    def has_page(self, filename, page_hash):
+        """Check if the previous run wrote filename with the same hash"""
+        return self.previous_hashes.get(filename) == page_hash and os.path.exists(
+            os.path.join(self.output_dir, filename)
+        )
+
+    def keep_page(self, filename, page_hash):
+        """Reuse a page from the previous run without rewriting it"""
+        self.filepaths.append(os.path.join(self.output_dir, filename))
+        self.record_page(filename, page_hash)
+
+    def record_page(self, filename, page_hash):
+        self.page_hashes[filename] = page_hash
+
+    def write(self, filename, data):
+        if filename in self.previous_hashes:
+            # Forget the old page first, an interrupted run must not keep it
+            del self.previous_hashes[filename]
+            self.save_manifest(self.previous_hashes)
+
+        filepath = os.path.join(self.output_dir, filename)
+        # Multi-size runs write each size into its own folder
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, "wb") as file:
+            file.write(data)
+        self.filepaths.append(filepath)
+
+    def close(self):
+        if not self.incremental:
+            return
+
+        # Pages the previous run wrote that this run did not
+        for filename in self.previous_hashes.keys() - self.page_hashes.keys():
+            try:
+                os.remove(os.path.join(self.output_dir, filename))
+            except FileNotFoundError:
+                pass
+
+        self.save_manifest(self.page_hashes)
+        self.previous_hashes = dict(self.page_hashes)
+
+    def save_manifest(self, page_hashes):
+        """Atomically replace the manifest"""
+        temporary_path = self.manifest_path() + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump({"pages": page_hashes}, file, indent=2)
+        os.replace(temporary_path, self.manifest_path())
+
+    def result(self):
+        """List of written file paths"""
+        return self.filepaths
+
+    def __str__(self):
+        return self.output_dir
+
+
+class MemorySink:
+    """Keep encoded pages in memory"""
+
+    def __init__(self):
+        self.pages = []
+
+    def write(self, filename, data):
+        self.pages.append((filename, data))
+
+    def close(self):
+        pass
+
+    def result(self):
+        """List of (filename, encoded bytes) tuples"""
+        return self.pages
+
+    def __str__(self):
+        return "memory"
+
+
+class ZipSink:
+    """Stream encoded pages straight into a ZIP archive"""
+
+    def __init__(self, fileobj=None):
+        self.fileobj = fileobj if fileobj is not None else BytesIO()
+        # Pages are already compressed, so store them as-is
+        self.zip_file = zipfile.ZipFile(self.fileobj, "w", zipfile.ZIP_STORED)
+        self.filenames = []
+
+    def write(self, filename, data):
+        self.zip_file.writestr(filename, data)
+        self.filenames.append(filename)
+
+    def close(self):
+        if self.zip_file is not None:
+            self.zip_file.close()
+            self.zip_file = None
+            if hasattr(self.fileobj, "seek"):
+                self.fileobj.seek(0)
+
+    def result(self):
+        """The archive file object, rewound to the start"""
+        self.close()
+        return self.fileobj
+
+    def __str__(self):
+        return "zip archive"
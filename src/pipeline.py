@@ -0,0 +1,47 @@
+import asyncio
+from functools import partial
+from src.carousel_generator import example_solid_colors, get_carousel_generator
+from src.content_generator import acontent_generator
+from src.output_sinks import ZipSink
+
+
+def render_carousel(content, background_configs=None, sink=None, encoder=None):
+    """Render a carousel with the shared generator, safe to run in any thread"""
+    return get_carousel_generator().generate_carousel(
+        data=content,
+        background_configs=background_configs,
+        sink=sink if sink is not None else ZipSink(),
+        encoder=encoder,
+    )
+
+
+async def generate_carousel_for_url(
+    url: str,
+    background_configs=None,
+    sink=None,
+    encoder=None,
+    llm=None,
+    executor=None,
+    **content_options,
+):
+    """Fetch, summarize and render a carousel without blocking the event loop
+
+    Mongo and the LLM are awaited directly, rendering runs in executor (the
+    loop's default thread pool if None). Returns sink.result(), a ZIP
+    archive by default. content_options are passed to acontent_generator.
+    """
+    content = await acontent_generator(url, llm=llm, **content_options)
+
+    if background_configs is None:
+        background_configs = example_solid_colors()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor,
+        partial(
+            render_carousel,
+            content,
+            background_configs=background_configs,
+            sink=sink,
+            encoder=encoder,
+        ),
+    )
@@ -0,0 +1,447 @@
+import argparse
+import collections
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from src.carousel_generator import example_solid_colors, get_carousel_generator
+from src.carousel_store import carousel_key, get_carousel_store
+from src.content_generator import create_llm, summarize_transcription
+from src.db import get_db, transcription_pipeline
+from src.output_sinks import ZipSink
+from src.resources import load_environment
+
+# Documents whose first transcription has arrived
+has_transcription = {"youtube_metadata.transcriptions.0": {"$exists": True}}
+
+
+def document_transcription(doc):
+    """Segments of the first transcription of a thread_source_datas document"""
+    transcriptions = (doc.get("youtube_metadata") or {}).get("transcriptions") or []
+    if not transcriptions:
+        return None
+    return transcriptions[0].get("transcription") or None
+
+
+def render_zip(content, background_configs):
+    """Render a carousel into ZIP archive bytes inside a worker process"""
+    archive = get_carousel_generator().generate_carousel(
+        data=content, background_configs=background_configs, sink=ZipSink()
+    )
+    return archive.getvalue()
+
+
+class WatchState:
+    """Change stream resume token and polling checkpoint, kept in a JSON file"""
+
+    def __init__(self, path):
+        from bson import json_util
+
+        self.path = path
+        self.values = {}
+        if os.path.exists(path):
+            # Extended JSON keeps ObjectIds and dates comparable after a restart
+            with open(path, "r", encoding="utf-8") as file:
+                self.values = json_util.loads(file.read())
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def set(self, key, value):
+        from bson import json_util
+
+        self.values[key] = value
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(json_util.dumps(self.values))
+        os.replace(temporary_path, self.path)
+
+
+class Checkpoint:
+    """Feed position of the newest document with every earlier one finished
+
+    Positions are added in feed order and saved to state under name once
+    they and all positions before them are finished, so a restart resumes
+    at the oldest document that was still queued or in progress.
+    """
+
+    def __init__(self, state, name):
+        self.state = state
+        self.name = name
+        self._positions = collections.deque()
+        self._lock = threading.Lock()
+
+    def add(self, position):
+        """Track a position, returns a callable marking it finished"""
+        entry = [position, False]
+        with self._lock:
+            self._positions.append(entry)
+        return lambda: self._finish(entry)
+
+    def _finish(self, entry):
+        with self._lock:
+            entry[1] = True
+            finished = None
+            while self._positions and self._positions[0][1]:
+                finished = self._positions.popleft()[0]
+            if finished is not None:
+                self.state.set(self.name, finished)
+
+
+def change_stream_pipeline():
+    """Match inserts and replaces with transcriptions, and updates setting them
+
+    Updates must touch youtube_metadata or its transcriptions, so unrelated
+    updates of old documents do not summarize them again.
+    """
+    updated_transcriptions = {
+        "$filter": {
+            "input": {"$objectToArray": "$updateDescription.updatedFields"},
+            "cond": {
+                "$regexMatch": {
+                    "input": "$$this.k",
+                    "regex": r"^youtube_metadata(\.transcriptions(\.|$)|$)",
+                }
+            },
+        }
+    }
+    return [
+        {
+            "$match": {
+                **{
+                    f"fullDocument.{key}": value
+                    for key, value in has_transcription.items()
+                },
+                "$or": [
+                    {"operationType": {"$in": ["insert", "replace"]}},
+                    {
+                        "operationType": "update",
+                        "$expr": {"$gt": [{"$size": updated_transcriptions}, 0]},
+                    },
+                ],
+            }
+        }
+    ]
+
+
+def watch_changes(collection, state, stop):
+    """Yield documents whose transcriptions were just set, from a change stream
+
+    Items are ({source_url, transcription}, resume token) pairs, the caller
+    saves the token as "resume_token" once the document is done. Raises
+    pymongo's OperationFailure right away when the server has no change
+    streams, as on a standalone mongod.
+    """
+    with collection.watch(
+        change_stream_pipeline(),
+        full_document="updateLookup",
+        resume_after=state.get("resume_token"),
+        max_await_time_ms=1000,
+    ) as stream:
+        while not stop.is_set() and stream.alive:
+            change = stream.try_next()
+            if change is not None:
+                doc = change["fullDocument"]
+                yield {
+                    "source_url": doc.get("source_url"),
+                    "transcription": document_transcription(doc),
+                }, change["_id"]
+
+
+def latest_position(collection, timestamp_field):
+    """(timestamp, _id) of the newest document, or None if there is none"""
+    newest = next(
+        collection.find({timestamp_field: {"$exists": True}}, {timestamp_field: 1})
+        .sort([(timestamp_field, -1), ("_id", -1)])
+        .limit(1),
+        None,
+    )
+    return newest and [newest[timestamp_field], newest["_id"]]
+
+
+def poll_changes(
+    collection,
+    state,
+    stop,
+    timestamp_field,
+    interval=5.0,
+    batch_size=100,
+    once=False,
+    backfill=False,
+):
+    """Yield new documents by polling timestamp_field
+
+    Items are ({source_url, transcription}, (timestamp, _id)) pairs, the
+    caller saves the position as "checkpoint" once the document is done. An
+    index on (timestamp_field, _id) serves every poll. Without a saved
+    checkpoint polling starts after the newest document, like a change
+    stream, unless backfill is set.
+    """
+    collection.create_index([(timestamp_field, 1), ("_id", 1)])
+
+    checkpoint = state.get("checkpoint")
+    if checkpoint is None and not backfill:
+        checkpoint = latest_position(collection, timestamp_field)
+        if checkpoint is not None:
+            state.set("checkpoint", checkpoint)
+
+    while not stop.is_set():
+        query = dict(has_transcription)
+        if checkpoint is not None:
+            timestamp, last_id = checkpoint
+            query["$or"] = [
+                {timestamp_field: {"$gt": timestamp}},
+                {timestamp_field: timestamp, "_id": {"$gt": last_id}},
+            ]
+        else:
+            query[timestamp_field] = {"$exists": True}
+
+        pipeline = transcription_pipeline(
+            query,
+            limit=batch_size,
+            sort={timestamp_field: 1, "_id": 1},
+            fields=("_id", timestamp_field),
+        )
+        docs = list(collection.aggregate(pipeline))
+        for doc in docs:
+            checkpoint = [doc[timestamp_field], doc["_id"]]
+            yield doc, checkpoint
+
+        if len(docs) < batch_size:
+            if once:
+                return
+            stop.wait(interval)
+
+
+class PreGenerator:
+    """Summarize and render carousels ahead of time into the carousel store
+
+    Documents wait in a bounded queue. offer() blocks while it is full, so a
+    burst of new transcriptions slows the watcher down instead of piling up
+    in memory.
+    """
+
+    def __init__(
+        self,
+        store=None,
+        llm=None,
+        background_configs=None,
+        workers=4,
+        render_workers=None,
+        max_queued=32,
+    ):
+        self.store = store or get_carousel_store()
+        self.llm = llm
+        self.background_configs = background_configs or example_solid_colors()
+        self.workers = workers
+        self.render_workers = render_workers or os.cpu_count() or 1
+        self.queue = queue.Queue(maxsize=max_queued)
+        self.stop_event = threading.Event()
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._render_pool = None
+
+    def start(self):
+        if self.llm is None:
+            self.llm = create_llm()
+        self._render_pool = ProcessPoolExecutor(max_workers=self.render_workers)
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"pregenerate-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def offer(self, doc, done=None):
+        """Queue a document, waiting for room. Returns False if it was skipped
+
+        done is called once the document is stored, failed or skipped, but
+        not when it is dropped because the pre-generator is stopping.
+        """
+        url = doc.get("source_url")
+        transcription = doc.get("transcription")
+        if not url or not transcription:
+            with self._lock:
+                self.skipped += 1
+            if done:
+                done()
+            return False
+
+        key = carousel_key(url, transcription, self.background_configs)
+        with self._lock:
+            skip = key in self._pending or self.store.has(key)
+            if skip:
+                self.skipped += 1
+            else:
+                self._pending.add(key)
+        if skip:
+            if done:
+                done()
+            return False
+
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put((key, url, transcription, done), timeout=0.5)
+                return True
+            except queue.Full:
+                pass
+        with self._lock:
+            self._pending.discard(key)
+        return False
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            key, url, transcription, done = item
+            try:
+                content = summarize_transcription(transcription, llm=self.llm)
+                zip_data = self._render_pool.submit(
+                    render_zip, content, self.background_configs
+                ).result()
+                self.store.put(key, zip_data, content=content, url=url)
+                with self._lock:
+                    self.completed += 1
+                print(f"Pre-generated: {url}")
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                print(f"Could not pre-generate {url} - {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                if done:
+                    done()
+
+    def close(self):
+        """Finish the queued documents and stop the workers"""
+        for _ in self._threads:
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self._render_pool is not None:
+            self._render_pool.shutdown()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "completed": self.completed,
+                "failed": self.failed,
+                "skipped": self.skipped,
+                "queued": self.queue.qsize(),
+                "in_progress": len(self._pending),
+            }
+
+
+def run_pregeneration(
+    collection,
+    pregenerator,
+    state,
+    mode="auto",
+    timestamp_field="updated_at",
+    poll_interval=5.0,
+    once=False,
+    backfill=False,
+):
+    """Feed new transcriptions of collection to pregenerator until stopped
+
+    mode "changes" uses a change stream, "poll" polls timestamp_field, and
+    "auto" tries the change stream first. once polls until caught up and
+    returns after the queue drains. backfill polls every existing document
+    on the first run instead of starting at the newest one.
+    """
+    from pymongo.errors import OperationFailure
+
+    stop = pregenerator.stop_event
+    pregenerator.start()
+    try:
+        if mode in ("auto", "changes") and not once and not backfill:
+            resume = Checkpoint(state, "resume_token")
+            try:
+                for doc, token in watch_changes(collection, state, stop):
+                    pregenerator.offer(doc, done=resume.add(token))
+                return
+            except OperationFailure as e:
+                if mode == "changes":
+                    raise
+                print(f"Change streams unavailable, polling {timestamp_field} - {e}")
+
+        checkpoint = Checkpoint(state, "checkpoint")
+        for doc, position in poll_changes(
+            collection,
+            state,
+            stop,
+            timestamp_field,
+            poll_interval,
+            once=once,
+            backfill=backfill,
+        ):
+            pregenerator.offer(doc, done=checkpoint.add(position))
+    except KeyboardInterrupt:
+        stop.set()
+    finally:
+        pregenerator.close()
+        print(f"Pre-generation stopped: {pregenerator.stats()}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Pre-generate carousels for new transcriptions"
+    )
+    parser.add_argument("--mongo-uri", help="Defaults to MONGO_DB_URI")
+    parser.add_argument("--db", help="Defaults to MONGO_DB_NAME")
+    parser.add_argument("--mode", choices=["auto", "changes", "poll"], default="auto")
+    parser.add_argument(
+        "--timestamp-field",
+        default="updated_at",
+        help="Indexed field polled when change streams are unavailable",
+    )
+    parser.add_argument("--poll-interval", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--render-workers", type=int, default=None)
+    parser.add_argument("--max-queued", type=int, default=32)
+    parser.add_argument("--state", default="pregenerate_state.json")
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Poll until caught up, finish the queue and exit",
+    )
+    parser.add_argument(
+        "--backfill",
+        action="store_true",
+        help="Poll documents that existed before the first run too",
+    )
+    args = parser.parse_args(argv)
+
+    load_environment()
+    if args.mongo_uri:
+        from pymongo import MongoClient
+
+        database = MongoClient(args.mongo_uri)[args.db or os.getenv("MONGO_DB_NAME")]
+    else:
+        database = get_db()
+
+    run_pregeneration(
+        database["thread_source_datas"],
+        PreGenerator(
+            workers=args.workers,
+            render_workers=args.render_workers,
+            max_queued=args.max_queued,
+        ),
+        WatchState(args.state),
+        mode=args.mode,
+        timestamp_field=args.timestamp_field,
+        poll_interval=args.poll_interval,
+        once=args.once,
+        backfill=args.backfill,
+    )
+
+
+if __name__ == "__main__":
+    main()
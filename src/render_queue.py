@@ -0,0 +1,179 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.carousel_generator import get_carousel_generator
+from src.output_sinks import ZipSink
+from src.resources import get_resource
+
+
+class QueueFullError(Exception):
+    """Raised when every render slot is busy and the wait queue is full"""
+
+
+# Marks the end of a streamed render
+_stream_end = object()
+
+
+class PageStream:
+    """Iterator over the pages of a streamed render
+
+    Closing it, or dropping it unread, stops the render and frees its slot.
+    """
+
+    def __init__(self, pages, future, cancelled):
+        self.pages = pages
+        self.future = future
+        self.cancelled = cancelled
+        self._finished = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._finished or self.cancelled.is_set():
+            raise StopIteration
+        page = self.pages.get()
+        if page is _stream_end:
+            self._finished = True
+            self.cancelled.set()
+            # Raise the render's error, if any
+            self.future.result()
+            raise StopIteration
+        return page
+
+    def close(self):
+        self._finished = True
+        self.cancelled.set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        self.cancelled.set()
+
+
+class RenderQueue:
+    """Bounded queue of render jobs, each rendered into its own in-memory ZIP"""
+
+    def __init__(self, slots=None, max_queued=16):
+        self.slots = slots or os.cpu_count() or 1
+        self.max_queued = max_queued
+        self.running = 0
+        self.waiting = 0
+        self._lock = threading.Lock()
+        self._admission = threading.BoundedSemaphore(self.slots + max_queued)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.slots, thread_name_prefix="render"
+        )
+
+    def submit(self, content, background_configs=None, encoder=None, **size):
+        """Queue a carousel render and return a future of its ZIP archive
+
+        Raises QueueFullError instead of waiting when the queue is full.
+        """
+        return self._submit(self._render, content, background_configs, encoder, size)
+
+    def stream(self, content, background_configs=None, encoder=None, **size):
+        """Queue a carousel render and iterate over its pages as they are ready
+
+        Returns an iterator of CarouselPage, title page first. At most two
+        pages wait between the render slot and the reader, and closing the
+        iterator early stops the render. Raises QueueFullError instead of
+        waiting when the queue is full.
+        """
+        pages = queue.Queue(maxsize=2)
+        cancelled = threading.Event()
+        future = self._submit(
+            self._stream,
+            content,
+            background_configs,
+            encoder,
+            size,
+            pages,
+            cancelled,
+        )
+
+        return PageStream(pages, future, cancelled)
+
+    def _submit(self, function, *args):
+        if not self._admission.acquire(blocking=False):
+            raise QueueFullError(
+                f"All {self.slots} render slots and {self.max_queued} queue "
+                "places are taken"
+            )
+
+        with self._lock:
+            self.waiting += 1
+        try:
+            future = self._executor.submit(self._run, function, *args)
+        except Exception:
+            with self._lock:
+                self.waiting -= 1
+            self._admission.release()
+            raise
+        future.add_done_callback(lambda _: self._admission.release())
+        return future
+
+    def _run(self, function, *args):
+        with self._lock:
+            self.waiting -= 1
+            self.running += 1
+        try:
+            return function(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def _render(self, content, background_configs, encoder, size):
+        # Every job gets its own sink, nothing is shared on disk
+        return get_carousel_generator(**size).generate_carousel(
+            data=content,
+            background_configs=background_configs,
+            sink=ZipSink(),
+            encoder=encoder,
+        )
+
+    def _stream(self, content, background_configs, encoder, size, pages, cancelled):
+        try:
+            for page in get_carousel_generator(**size).iter_carousel(
+                content, background_configs=background_configs, encoder=encoder
+            ):
+                if not _offer(pages, page, cancelled):
+                    return
+        finally:
+            _offer(pages, _stream_end, cancelled)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "slots": self.slots,
+                "max_queued": self.max_queued,
+                "running": self.running,
+                "waiting": self.waiting,
+            }
+
+
+def _offer(pages, item, cancelled):
+    """Put item on the queue unless the reader went away"""
+    while not cancelled.is_set():
+        try:
+            pages.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def get_render_queue():
+    """Process-wide render queue sized by RENDER_SLOTS and RENDER_QUEUE_SIZE"""
+    return get_resource(
+        "render_queue",
+        lambda: RenderQueue(
+            slots=int(os.getenv("RENDER_SLOTS", "0")) or None,
+            max_queued=int(os.getenv("RENDER_QUEUE_SIZE", "16")),
+        ),
+    )
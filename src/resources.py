@@ -0,0 +1,41 @@
+import threading
+
+_resources = {}
+# Reentrant, factories may load other shared resources
+_lock = threading.RLock()
+
+
+def get_resource(key, factory):
+    """Get a process-wide resource, creating it once with factory()"""
+    resource = _resources.get(key)
+    if resource is None:
+        with _lock:
+            resource = _resources.get(key)
+            if resource is None:
+                resource = _resources[key] = factory()
+    return resource
+
+
+def load_environment():
+    """Load .env into os.environ, once per process
+
+    Entry points call this at startup. The Mongo and Gemini factories call it
+    too, so library use without an entry point still sees .env values.
+    """
+
+    def load():
+        from dotenv import load_dotenv
+        from src.metrics import metrics
+
+        load_dotenv()
+        # Modules importing metrics ran before .env was loaded
+        metrics.configure_from_env()
+        return True
+
+    return get_resource("environment", load)
+
+
+def reset_resources():
+    """Forget every shared resource so the next use creates it again"""
+    with _lock:
+        _resources.clear()
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from src.resources import get_resource
+
+default_cache_path = os.path.join(
+    os.path.dirname(__file__), "../.cache/summaries.sqlite3"
+)
+
+
+def summary_key(transcript, prompt_template, model_name, temperature):
+    """Hash of everything that determines a summary"""
+    payload = json.dumps(
+        [transcript, prompt_template, model_name, temperature], ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """Persistent SQLite cache of parsed summaries with TTL and LRU eviction"""
+
+    def __init__(self, path=None, ttl_seconds=30 * 24 * 3600, max_bytes=64 * 1024**2):
+        self.path = path or default_cache_path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._memory_connection = None
+        with self._connect() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS summaries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """)
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS summaries_accessed_at "
+                "ON summaries (accessed_at)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        """Connection committed on success and closed afterwards"""
+        if self.path == ":memory:":
+            # A single connection keeps an in-memory database alive
+            if self._memory_connection is None:
+                self._memory_connection = sqlite3.connect(
+                    ":memory:", check_same_thread=False
+                )
+            with self._memory_connection as connection:
+                yield connection
+            return
+
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get(self, key):
+        """Get a cached summary, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock, self._connect() as connection:
+            row = connection.execute(
+                "SELECT value, created_at FROM summaries WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is not None and now - row[1] > self.ttl_seconds:
+                connection.execute("DELETE FROM summaries WHERE key = ?", (key,))
+                self.evictions += 1
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            connection.execute(
+                "UPDATE summaries SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key, summary):
+        """Store a summary and evict least recently used entries over the cap"""
+        value = json.dumps(summary, ensure_ascii=False)
+        size = len(value.encode("utf-8"))
+        now = time.time()
+        with self._lock, self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO summaries "
+                "(key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+
+            total = connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM summaries"
+            ).fetchone()[0]
+            if total <= self.max_bytes:
+                return
+
+            for old_key, old_size in connection.execute(
+                "SELECT key, size FROM summaries ORDER BY accessed_at"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                connection.execute("DELETE FROM summaries WHERE key = ?", (old_key,))
+                total -= old_size
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every cached summary"""
+        with self._lock, self._connect() as connection:
+            connection.execute("DELETE FROM summaries")
+
+    def stats(self):
+        """Get hit, miss and eviction counters with current usage"""
+        with self._lock, self._connect() as connection:
+            entries, size = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM summaries"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def get_summary_cache():
+    """Get the process-wide summary cache, stored at SUMMARY_CACHE_PATH"""
+    return get_resource(
+        "summary_cache", lambda: SummaryCache(os.getenv("SUMMARY_CACHE_PATH"))
+    )
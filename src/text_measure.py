@@ -0,0 +1,139 @@
+import hashlib
+import os
+import PIL
+from PIL import ImageFont
+
+
+class TextMeasurer:
+    """Memoized text metrics and line breaking, cached per (font, size)"""
+
+    # Cumulative width estimates closer than this to the limit are confirmed
+    # with an exact bounding box, so line breaks always match a full measure.
+    boundary_tolerance = 4
+
+    def __init__(self, max_entries_per_font=8192):
+        self.max_entries_per_font = max_entries_per_font
+        self._bbox_cache = {}
+        self._length_cache = {}
+        self._identity_cache = {}
+
+    @staticmethod
+    def font_key(font):
+        """Identify a font by file, face index and size"""
+        if isinstance(font, ImageFont.FreeTypeFont):
+            return (font.path, font.index, font.size, font.layout_engine)
+        return ("bitmap", id(font))
+
+    def font_identity(self, font):
+        """Identify a font the same way in every process and checkout
+
+        font_key holds an absolute path or an object id, which is fine for
+        in-memory caches. Keys saved to disk use the file name, family and
+        style, face index, size and a hash of the font file instead.
+        """
+        key = self.font_key(font)
+        identity = self._identity_cache.get(key)
+        if identity is None:
+            if isinstance(font, ImageFont.FreeTypeFont):
+                if isinstance(font.path, (str, bytes, os.PathLike)):
+                    file_name = os.path.basename(os.fsdecode(font.path))
+                    with open(font.path, "rb") as file:
+                        data = file.read()
+                else:
+                    # Fonts loaded from memory, like Pillow's default font
+                    file_name = None
+                    data = font.path.getvalue()
+                identity = (
+                    file_name,
+                    font.getname(),
+                    font.index,
+                    font.size,
+                    int(font.layout_engine),
+                    hashlib.sha256(data).hexdigest(),
+                )
+            else:
+                # Bitmap fonts are built into Pillow
+                identity = ("bitmap", type(font).__name__, PIL.__version__)
+            identity = self._identity_cache[key] = identity
+        return identity
+
+    def _cache_for(self, caches, font):
+        key = self.font_key(font)
+        cache = caches.get(key)
+        if cache is None:
+            cache = caches[key] = {}
+        elif len(cache) >= self.max_entries_per_font:
+            cache.clear()
+        return cache
+
+    def bbox(self, text, font):
+        """Get text bounding box, identical to ImageDraw.textbbox at (0, 0)"""
+        cache = self._cache_for(self._bbox_cache, font)
+        bbox = cache.get(text)
+        if bbox is None:
+            bbox = cache[text] = tuple(font.getbbox(text))
+        return bbox
+
+    def width(self, text, font):
+        """Get width of the text bounding box"""
+        bbox = self.bbox(text, font)
+        return bbox[2] - bbox[0]
+
+    def height(self, text, font):
+        """Get height of the text bounding box"""
+        bbox = self.bbox(text, font)
+        return bbox[3] - bbox[1]
+
+    def length(self, text, font):
+        """Get horizontal advance of the text"""
+        cache = self._cache_for(self._length_cache, font)
+        length = cache.get(text)
+        if length is None:
+            length = cache[text] = font.getlength(text)
+        return length
+
+    def wrap(self, text, font, max_width):
+        """Wrap text to fit within max_width using cumulative word advances"""
+        lines = []
+        current_line = []
+        space = self.length(" ", font)
+        line_advance = 0.0  # advance of the current line plus a trailing space
+        line_left = 0
+
+        for word in text.split():
+            if current_line:
+                estimate = line_advance + self.bbox(word, font)[2] - line_left
+            else:
+                estimate = self.width(word, font)
+
+            if abs(estimate - max_width) <= self.boundary_tolerance:
+                test_line = " ".join(current_line + [word])
+                fits = self.width(test_line, font) <= max_width
+            else:
+                fits = estimate <= max_width
+
+            if fits:
+                if not current_line:
+                    line_left = self.bbox(word, font)[0]
+                current_line.append(word)
+                line_advance += self.length(word, font) + space
+            elif current_line:
+                lines.append(" ".join(current_line))
+                current_line = [word]
+                line_left = self.bbox(word, font)[0]
+                line_advance = self.length(word, font) + space
+            else:
+                lines.append(word)
+
+        if current_line:
+            lines.append(" ".join(current_line))
+
+        return lines
+
+
+_shared_measurer = TextMeasurer()
+
+
+def get_measurer():
+    """Get the process-wide text measurer"""
+    return _shared_measurer
@@ -0,0 +1,28 @@
+from src.batch import Manifest
+
+
+def test_manifest_skips_partially_written_line(tmp_path, capsys):
+    path = tmp_path / "manifest.jsonl"
+    path.write_text(
+        '{"url": "https://youtu.be/a", "status": "done"}\n'
+        '{"url": "https://youtu.be/b", "status": "failed"}\n'
+        '{"url": "https://youtu.be/c", "sta',
+        encoding="utf-8",
+    )
+
+    manifest = Manifest(str(path))
+
+    assert manifest.status == {
+        "https://youtu.be/a": "done",
+        "https://youtu.be/b": "failed",
+    }
+    assert "Skipping unreadable line 3" in capsys.readouterr().out
+
+
+def test_manifest_records_after_partial_line(tmp_path):
+    path = tmp_path / "manifest.jsonl"
+    path.write_text('{"url": "https://youtu.be/a", "sta', encoding="utf-8")
+
+    Manifest(str(path)).record("https://youtu.be/b", "done")
+
+    assert Manifest(str(path)).is_done("https://youtu.be/b")
@@ -0,0 +1,58 @@
+import io
+import json
+import os
+from PIL import Image
+from src.background_cache import BackgroundCache
+from src.carousel_generator import CarouselGenerator
+from src.output_sinks import MemorySink
+
+content = {"title": "A title", "notes": ["First point", "Second point"]}
+
+
+def test_renders_json_loaded_solid_colors():
+    # Colors in batch job files are JSON arrays, so they arrive as lists
+    configs = json.loads('[{"type": "solid", "color": [45, 52, 54]}]')
+    pages = CarouselGenerator(270, 480).generate_carousel(
+        data=content, background_configs=configs, sink=MemorySink()
+    )
+
+    assert pages
+    for _, data in pages:
+        with Image.open(io.BytesIO(data)) as image:
+            assert image.convert("RGB").getpixel((0, 0)) == (45, 52, 54)
+
+
+def test_pool_workers_reuse_backgrounds_prepared_once(tmp_path, monkeypatch):
+    image_path = str(tmp_path / "background.png")
+    Image.new("RGB", (300, 400), (200, 120, 40)).save(image_path)
+    configs = [{"type": "image", "path": image_path}]
+    sizes = [(270, 480), (270, 338), (270, 270)]
+    decode_log = tmp_path / "decodes.txt"
+    open_image = Image.open
+
+    def logged_open(path, *args, **kwargs):
+        # Forked pool workers inherit this, so their decodes are logged too
+        if path == image_path:
+            with open(decode_log, "a") as file:
+                file.write(f"{os.getpid()}\n")
+        return open_image(path, *args, **kwargs)
+
+    monkeypatch.setattr(Image, "open", logged_open)
+    parallel = CarouselGenerator(270, 480, background_cache=BackgroundCache())
+    pages = parallel.generate_carousel(
+        data=content,
+        background_configs=configs,
+        sink=MemorySink(),
+        sizes=sizes,
+        workers=2,
+    )
+
+    assert decode_log.read_text().split() == [str(os.getpid())]
+    serial = CarouselGenerator(270, 480, background_cache=BackgroundCache())
+    assert pages == serial.generate_carousel(
+        data=content,
+        background_configs=configs,
+        sink=MemorySink(),
+        sizes=sizes,
+        workers=1,
+    )
@@ -0,0 +1,96 @@
+import hashlib
+import os
+import zipfile
+from io import BytesIO
+from src.carousel_store import CarouselStore
+
+
+def make_zip(*pages):
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for i, data in enumerate(pages):
+            archive.writestr(f"page_{i + 1:02d}.png", data)
+    return buffer.getvalue()
+
+
+def blob_count(store):
+    return sum(1 for _ in store.backend.scan("blobs"))
+
+
+def set_mtime(store, name, mtime):
+    os.utime(store.backend.path(name), (mtime, mtime))
+
+
+def test_put_and_get(tmp_path):
+    store = CarouselStore(str(tmp_path))
+    pages = (b"first page", b"second page")
+    zip_data = make_zip(*pages)
+
+    store.put("key", zip_data, content={"title": "A title"}, url="https://youtu.be/a")
+
+    assert store.has("key")
+    assert store.get("key") == zip_data
+    assert store.get_pages("key") == [
+        ("page_01.png", pages[0]),
+        ("page_02.png", pages[1]),
+    ]
+    assert store.get_content("key") == {"title": "A title"}
+    assert store.get("missing") is None
+
+
+def test_missing_blob_is_a_miss(tmp_path):
+    store = CarouselStore(str(tmp_path))
+    zip_data = make_zip(b"page")
+    store.put("key", zip_data)
+
+    store.backend.delete(store.blob_name(hashlib.sha256(zip_data).hexdigest()))
+
+    assert store.get("key") is None
+
+
+def test_entries_share_identical_blobs(tmp_path):
+    store = CarouselStore(str(tmp_path))
+    shared = b"shared page"
+
+    store.put("a", make_zip(shared, b"page of a"))
+    store.put("b", make_zip(shared, b"page of b"))
+
+    # Two archives, the shared page once and one own page each
+    assert blob_count(store) == 5
+    assert store.get_pages("a")[0] == store.get_pages("b")[0]
+
+
+def test_evicts_least_recently_read_entries(tmp_path):
+    store = CarouselStore(str(tmp_path), max_bytes=10_000)
+    for key in ("a", "b"):
+        store.put(key, make_zip(os.urandom(1000), os.urandom(1000)))
+    set_mtime(store, store.entry_name("a"), 1000)
+    set_mtime(store, store.entry_name("b"), 2000)
+    # Reading a makes b the least recently used entry
+    assert store.get("a") is not None
+    b_pages = store.get_entry("b")["pages"]
+
+    store.put("c", make_zip(os.urandom(1000), os.urandom(1000)))
+
+    assert store.has("a") and store.has("c")
+    assert not store.has("b")
+    for _, digest in b_pages:
+        assert not store.backend.exists(store.blob_name(digest))
+    assert store.stats()["bytes"] <= store.max_bytes
+
+
+def test_eviction_removes_old_orphan_blobs(tmp_path):
+    store = CarouselStore(str(tmp_path), max_bytes=5_000)
+    store.put("a", make_zip(os.urandom(1000)))
+    old_orphan = store.blob_name("00" * 32)
+    recent_orphan = store.blob_name("11" * 32)
+    store.backend.write(old_orphan, os.urandom(1000))
+    store.backend.write(recent_orphan, os.urandom(1000))
+    set_mtime(store, old_orphan, 1000)
+    store._used = None
+
+    store.put("b", make_zip(os.urandom(2000)))
+
+    assert not store.backend.exists(old_orphan)
+    # It may belong to a put that has not written its entry yet
+    assert store.backend.exists(recent_orphan)
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+from src.content_generator import (
+    create_llm,
+    content_cache_key,
+    asummarize_chunks,
+    estimate_tokens,
+    split_transcription,
+    summarize_transcription,
+    window_position,
+)
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class StubLLM:
+    """Chat model stand-in that records its prompts and overlapping calls"""
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.prompts = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def answer(self, prompt):
+        if "Here are the notes of each part" in prompt:
+            title = "Merged"
+        else:
+            title = f"Part {len(self.prompts)}"
+        return FakeResponse(
+            "```json\n" + json.dumps({"title": title, "notes": [title]}) + "\n```"
+        )
+
+    def started(self, prompt):
+        with self._lock:
+            self.prompts.append(prompt)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def finished(self):
+        with self._lock:
+            self.active -= 1
+
+    def invoke(self, prompt):
+        self.started(prompt)
+        time.sleep(self.latency)
+        self.finished()
+        return self.answer(prompt)
+
+    async def ainvoke(self, prompt):
+        self.started(prompt)
+        await asyncio.sleep(self.latency)
+        self.finished()
+        return self.answer(prompt)
+
+
+def segments(count, words=50, start=True):
+    text = " ".join(["word"] * words)
+    return [
+        {"text": text, "start": i * 10.0} if start else {"text": text}
+        for i in range(count)
+    ]
+
+
+def test_split_keeps_windows_under_budget_and_in_order():
+    transcription = segments(20)
+    budget = estimate_tokens(transcription[0]["text"]) * 3
+    windows = split_transcription(transcription, max_tokens=budget)
+
+    assert [len(window) for window in windows] == [3, 3, 3, 3, 3, 3, 2]
+    assert [segment for window in windows for segment in window] == transcription
+
+
+def test_split_gives_oversized_segment_its_own_window():
+    transcription = segments(1) + segments(1, words=2000) + segments(1)
+    windows = split_transcription(transcription, max_tokens=100)
+
+    assert windows == [[segment] for segment in transcription]
+
+
+def test_window_position_with_timestamps():
+    window = [{"text": "a", "start": 65.0}, {"text": "b", "offset": 3725}]
+
+    assert window_position(window, 1, 3) == " (part 2 of 3, from 1:05 to 1:02:05)"
+
+
+def test_window_position_without_timestamps():
+    window = [{"text": "a"}, {"text": "b"}]
+
+    assert window_position(window, 0, 2) == " (part 1 of 2)"
+
+
+def test_chunks_run_at_most_max_concurrency_at_once():
+    llm = StubLLM()
+    summary = summarize_transcription(
+        segments(40),
+        llm=llm,
+        cache=False,
+        chunked=True,
+        chunk_tokens=130,
+        max_concurrency=3,
+    )
+
+    # 20 windows of two segments, then one merge call
+    assert len(llm.prompts) == 21
+    assert llm.max_active == 3
+    assert summary["title"] == "Merged"
+    assert "Here are the notes of each part" in llm.prompts[-1]
+
+
+def test_async_chunks_run_at_most_max_concurrency_at_once():
+    llm = StubLLM()
+    windows = split_transcription(segments(40), max_tokens=130)
+    summaries = asyncio.run(asummarize_chunks(llm, windows, max_concurrency=3))
+
+    assert len(summaries) == len(windows) == 20
+    assert llm.max_active == 3
+
+
+def test_single_window_skips_merge_call():
+    llm = StubLLM(latency=0)
+    summary = summarize_transcription(
+        segments(3), llm=llm, cache=False, chunked=True, chunk_tokens=6000
+    )
+
+    assert len(llm.prompts) == 1
+    assert "Here are the notes of each part" not in llm.prompts[0]
+    assert summary == {"title": "Part 1", "notes": ["Part 1"]}
+
+
+def test_cache_key_of_model_without_name_differs_from_default():
+    default_key = content_cache_key("text", None, False, 6000)
+
+    assert content_cache_key("text", StubLLM(), False, 6000) != default_key
+    assert content_cache_key("text", None, False, 6000) == default_key
+
+
+class GeminiLikeLLM:
+    """Model attributes as ChatGoogleGenerativeAI reports them"""
+
+    model = "models/gemini-1.5-flash"
+    temperature = 0.5
+
+
+def test_cache_key_of_shared_client_matches_default():
+    assert content_cache_key("text", GeminiLikeLLM(), True, 6000) == (
+        content_cache_key("text", None, True, 6000)
+    )
+
+
+def test_cache_key_of_created_client_matches_default(monkeypatch):
+    pytest.importorskip("langchain_google_genai")
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+
+    assert content_cache_key("text", create_llm(), False, 6000) == (
+        content_cache_key("text", None, False, 6000)
+    )
@@ -0,0 +1,119 @@
+import asyncio
+import pytest
+from src import db
+
+mongomock = pytest.importorskip("mongomock")
+
+
+def segments(*texts):
+    return [
+        {"_id": f"id-{i}", "text": text, "start": float(i)}
+        for i, text in enumerate(texts)
+    ]
+
+
+@pytest.fixture
+def database(monkeypatch):
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(db, "db_client", client)
+    monkeypatch.setattr(db, "db_name", "carousel_test")
+    database = client["carousel_test"]
+    database["thread_source_datas"].insert_many(
+        [
+            {
+                "source_url": "https://youtu.be/first",
+                "title": "Not projected",
+                "youtube_metadata": {
+                    "description": "Not projected either",
+                    "transcriptions": [
+                        {"language": "en", "transcription": segments("one", "two")},
+                        {"language": "de", "transcription": segments("eins")},
+                    ],
+                },
+            },
+            {"source_url": "https://youtu.be/no-metadata", "youtube_metadata": None},
+            {
+                "source_url": "https://youtu.be/empty",
+                "youtube_metadata": {"transcriptions": []},
+            },
+        ]
+    )
+    return database
+
+
+def test_fetches_only_first_transcription_without_segment_ids(database):
+    transcription = db.get_thread_source_transcription_in_json("https://youtu.be/first")
+
+    assert transcription == [
+        {"text": "one", "start": 0.0},
+        {"text": "two", "start": 1.0},
+    ]
+
+
+def test_pipeline_projects_only_transcription_and_fields(database):
+    pipeline = db.transcription_pipeline(
+        {"source_url": "https://youtu.be/first"}, fields=("title",)
+    )
+    (doc,) = database["thread_source_datas"].aggregate(pipeline)
+
+    assert set(doc) == {"source_url", "title", "transcription"}
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://youtu.be/missing",
+        "https://youtu.be/no-metadata",
+        "https://youtu.be/empty",
+    ],
+)
+def test_raises_without_transcription(database, url):
+    with pytest.raises(ValueError):
+        db.get_thread_source_transcription_in_json(url)
+
+
+def test_get_transcriptions_leaves_out_urls_without_transcription(database):
+    transcriptions = db.get_transcriptions(
+        [
+            "https://youtu.be/first",
+            "https://youtu.be/missing",
+            "https://youtu.be/no-metadata",
+            "https://youtu.be/empty",
+        ]
+    )
+
+    assert transcriptions == {
+        "https://youtu.be/first": [
+            {"text": "one", "start": 0.0},
+            {"text": "two", "start": 1.0},
+        ]
+    }
+
+
+def test_ensure_indexes_creates_source_url_index():
+    database = mongomock.MongoClient()["carousel_test"]
+    db.ensure_indexes(database)
+
+    keys = [
+        index["key"]
+        for index in database["thread_source_datas"].index_information().values()
+    ]
+    assert [("source_url", 1)] in keys
+
+
+def test_connection_failure_raises_value_error(monkeypatch):
+    monkeypatch.setattr(db, "db_client", None)
+    monkeypatch.setattr(db, "load_environment", lambda: None)
+    monkeypatch.setenv("MONGO_DB_URI", "mongodb://user@")
+
+    with pytest.raises(ValueError, match="Error when connecting to database"):
+        db.get_db()
+
+
+def test_async_connection_failure_raises_value_error(monkeypatch):
+    monkeypatch.setattr(db, "db_async_client", None)
+    monkeypatch.setattr(db, "load_environment", lambda: None)
+    monkeypatch.setenv("MONGO_DB_URI", "mongodb://user@")
+
+    with pytest.raises(ValueError, match="Error when connecting to database"):
+        asyncio.run(db.get_async_db())
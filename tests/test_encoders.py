@@ -0,0 +1,25 @@
+import io
+from PIL import Image, ImageChops, ImageDraw
+from src.encoders import PageEncoder
+
+
+def solid_page():
+    page = Image.new("RGB", (200, 100), (45, 52, 54))
+    ImageDraw.Draw(page).text((10, 10), "Some text", fill=(255, 255, 255))
+    return page
+
+
+def decode(encoded):
+    return Image.open(io.BytesIO(encoded.data))
+
+
+def test_default_encoder_saves_rgb_png():
+    assert decode(PageEncoder().encode(solid_page())).mode == "RGB"
+
+
+def test_palette_encoder_keeps_every_color():
+    page = solid_page()
+    image = decode(PageEncoder(palette=True).encode(page))
+
+    assert image.mode == "P"
+    assert ImageChops.difference(page, image.convert("RGB")).getbbox() is None
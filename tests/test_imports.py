@@ -0,0 +1,15 @@
+import pytest
+from src.benchmark import heavy_modules, import_time
+
+
+@pytest.mark.parametrize("module", ["src.carousel_generator", "src.render_queue"])
+def test_rendering_imports_leave_heavy_dependencies_for_later(module):
+    # import_time runs python -X importtime in a fresh interpreter
+    seconds, loaded = import_time(module)
+
+    assert seconds > 0
+    assert loaded == []
+
+
+def test_heavy_modules_cover_mongo_langchain_and_dotenv():
+    assert {"pymongo", "langchain", "dotenv"} <= set(heavy_modules)
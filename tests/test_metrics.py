@@ -0,0 +1,43 @@
+from urllib.request import urlopen
+import pytest
+from src.metrics import metrics, serve_metrics
+from src.resources import load_environment, reset_resources
+
+
+def test_metrics_server_listens_on_localhost_by_default():
+    server = serve_metrics(port=0)
+    try:
+        host, port = server.server_address
+        assert host == "127.0.0.1"
+
+        metrics.inc("carousel_pages_total")
+        with urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            assert response.status == 200
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_configure_from_env_reads_flags_set_after_import(monkeypatch):
+    monkeypatch.setattr(metrics, "enabled", False)
+    monkeypatch.setattr(metrics, "tracing", False)
+    monkeypatch.setenv("CAROUSEL_METRICS", "1")
+    monkeypatch.delenv("CAROUSEL_TRACING", raising=False)
+
+    metrics.configure_from_env()
+
+    assert metrics.enabled and not metrics.tracing
+
+
+def test_load_environment_applies_metrics_flags(monkeypatch):
+    pytest.importorskip("dotenv")
+    monkeypatch.setattr(metrics, "enabled", False)
+    monkeypatch.setattr(metrics, "tracing", False)
+    # As if .env set them after src.metrics was imported
+    monkeypatch.setenv("CAROUSEL_METRICS", "1")
+    monkeypatch.setenv("CAROUSEL_TRACING", "1")
+    reset_resources()
+
+    load_environment()
+
+    assert metrics.enabled and metrics.tracing
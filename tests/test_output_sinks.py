@@ -0,0 +1,74 @@
+import json
+import os
+from PIL import Image
+from src.background_cache import BackgroundCache
+from src.carousel_generator import CarouselGenerator
+
+# Long enough for several points pages
+notes = [f"Point {i} " + "carries a sentence of filler words " * 6 for i in range(12)]
+
+
+def render(output_dir, data, background_configs=None):
+    """Render incrementally, returning the names of the files written"""
+    generator = CarouselGenerator(background_cache=BackgroundCache())
+    generator.generate_carousel(
+        data=data,
+        output_dir=str(output_dir),
+        background_configs=background_configs,
+        incremental=True,
+    )
+    return [page["filename"] for page in generator.encode_report]
+
+
+def manifest_pages(output_dir):
+    with open(output_dir / "manifest.json", encoding="utf-8") as file:
+        return json.load(file)["pages"]
+
+
+def test_unchanged_carousel_writes_nothing(tmp_path):
+    data = {"title": "A title", "notes": notes}
+    written = render(tmp_path, data)
+
+    assert written
+    assert sorted(manifest_pages(tmp_path)) == sorted(written)
+    assert render(tmp_path, data) == []
+
+
+def test_edited_note_rewrites_only_its_page(tmp_path):
+    render(tmp_path, {"title": "A title", "notes": notes})
+    before = manifest_pages(tmp_path)
+
+    edited = notes[:-1] + ["The last point was edited"]
+    written = render(tmp_path, {"title": "A title", "notes": edited})
+
+    after = manifest_pages(tmp_path)
+    assert written == [max(before)]
+    assert {name for name in after if after[name] != before[name]} == set(written)
+
+
+def test_fewer_notes_remove_trailing_pages(tmp_path):
+    render(tmp_path, {"title": "A title", "notes": notes})
+    before = manifest_pages(tmp_path)
+
+    render(tmp_path, {"title": "A title", "notes": notes[:2]})
+
+    after = manifest_pages(tmp_path)
+    assert len(after) < len(before)
+    for name in before.keys() - after.keys():
+        assert not os.path.exists(tmp_path / name)
+    for name in after:
+        assert os.path.exists(tmp_path / name)
+
+
+def test_background_image_change_rerenders_its_page(tmp_path):
+    image_path = tmp_path / "background.png"
+    Image.new("RGB", (540, 960), (20, 40, 60)).save(image_path)
+    output_dir = tmp_path / "carousel"
+    configs = [{"type": "image", "path": str(image_path)}, {"type": "solid"}]
+    data = {"title": "A title", "notes": notes}
+    render(output_dir, data, configs)
+
+    stat = os.stat(image_path)
+    os.utime(image_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert render(output_dir, data, configs) == ["page_01.png"]
@@ -0,0 +1,142 @@
+import threading
+import pytest
+from src.pregenerate import (
+    Checkpoint,
+    PreGenerator,
+    WatchState,
+    change_stream_pipeline,
+    poll_changes,
+)
+
+mongomock = pytest.importorskip("mongomock")
+
+
+class MemoryStore:
+    def __init__(self, keys=()):
+        self.keys = set(keys)
+
+    def has(self, key):
+        return key in self.keys
+
+
+def transcription_doc(i):
+    return {
+        "_id": i,
+        "source_url": f"https://youtu.be/{i}",
+        "updated_at": i,
+        "youtube_metadata": {"transcriptions": [{"transcription": [{"text": "hi"}]}]},
+    }
+
+
+@pytest.fixture
+def collection():
+    collection = mongomock.MongoClient()["carousel_test"]["thread_source_datas"]
+    collection.insert_many([transcription_doc(i) for i in range(3)])
+    return collection
+
+
+def poll(collection, state, **options):
+    return list(
+        poll_changes(
+            collection, state, threading.Event(), "updated_at", once=True, **options
+        )
+    )
+
+
+def test_checkpoint_saves_only_finished_prefix(tmp_path):
+    state = WatchState(str(tmp_path / "state.json"))
+    checkpoint = Checkpoint(state, "checkpoint")
+    first, second, third = (checkpoint.add(position) for position in (1, 2, 3))
+
+    second()
+    assert state.get("checkpoint") is None
+    first()
+    assert state.get("checkpoint") == 2
+    third()
+    assert WatchState(state.path).get("checkpoint") == 3
+
+
+def test_first_poll_starts_after_newest_document(collection, tmp_path):
+    state = WatchState(str(tmp_path / "state.json"))
+    assert poll(collection, state) == []
+    assert state.get("checkpoint") == [2, 2]
+
+    collection.insert_one(transcription_doc(3))
+    assert [doc["source_url"] for doc, _ in poll(collection, state)] == [
+        "https://youtu.be/3"
+    ]
+
+
+def test_backfill_polls_existing_documents(collection, tmp_path):
+    state = WatchState(str(tmp_path / "state.json"))
+    items = poll(collection, state, backfill=True)
+
+    assert [position for _, position in items] == [[0, 0], [1, 1], [2, 2]]
+    # Positions are saved by the caller once documents are done
+    assert state.get("checkpoint") is None
+
+
+def test_queued_documents_do_not_advance_checkpoint(collection, tmp_path):
+    state = WatchState(str(tmp_path / "state.json"))
+    checkpoint = Checkpoint(state, "checkpoint")
+    pregenerator = PreGenerator(store=MemoryStore(), background_configs=[{}])
+
+    for doc, position in poll(collection, state, backfill=True):
+        assert pregenerator.offer(doc, done=checkpoint.add(position))
+
+    # Nothing was rendered, a restart must see all three again
+    assert state.get("checkpoint") is None
+    assert pregenerator.stats()["queued"] == 3
+
+
+def test_skipped_documents_advance_checkpoint(tmp_path):
+    state = WatchState(str(tmp_path / "state.json"))
+    checkpoint = Checkpoint(state, "checkpoint")
+    pregenerator = PreGenerator(store=MemoryStore(), background_configs=[{}])
+
+    assert not pregenerator.offer({"source_url": "u"}, done=checkpoint.add(1))
+    assert state.get("checkpoint") == 1
+
+
+def change_event(operation, updated_fields=None, transcriptions=({},)):
+    event = {
+        "operationType": operation,
+        "fullDocument": {
+            "youtube_metadata": {"transcriptions": list(transcriptions)},
+        },
+    }
+    if updated_fields is not None:
+        event["updateDescription"] = {"updatedFields": updated_fields}
+    return event
+
+
+def test_change_stream_matches_only_transcription_updates():
+    events = mongomock.MongoClient()["carousel_test"]["events"]
+    events.insert_many(
+        [
+            dict(change_event("insert"), name="insert"),
+            dict(change_event("replace"), name="replace"),
+            dict(
+                change_event("update", {"youtube_metadata.transcriptions.0": {}}),
+                name="transcription set",
+            ),
+            dict(
+                change_event("update", {"youtube_metadata": {}}),
+                name="metadata set",
+            ),
+            dict(change_event("update", {"title": "New"}), name="title"),
+            dict(
+                change_event("update", {"youtube_metadata.description": "New"}),
+                name="description",
+            ),
+            dict(
+                change_event("update", {"youtube_metadata.transcriptions_count": 1}),
+                name="similar field",
+            ),
+            dict(change_event("insert", transcriptions=()), name="empty"),
+        ]
+    )
+
+    matched = [event["name"] for event in events.aggregate(change_stream_pipeline())]
+
+    assert matched == ["insert", "replace", "transcription set", "metadata set"]
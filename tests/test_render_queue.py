@@ -0,0 +1,44 @@
+import gc
+from src.render_queue import RenderQueue
+
+content = {"title": "A title", "notes": [f"Point number {i}" for i in range(12)]}
+size = {"width": 270, "height": 480}
+
+
+def wait_idle(render_queue, timeout=10):
+    render_queue._executor.submit(lambda: None).result(timeout=timeout)
+
+
+def test_stream_yields_every_page():
+    render_queue = RenderQueue(slots=1, max_queued=0)
+    pages = list(render_queue.stream(content, **size))
+
+    assert [page.index for page in pages] == list(range(pages[0].total))
+    assert render_queue.stats()["running"] == 0
+
+
+def test_closing_unread_stream_frees_its_slot():
+    render_queue = RenderQueue(slots=1, max_queued=1)
+    render_queue.stream(content, **size).close()
+    wait_idle(render_queue)
+
+    assert list(render_queue.stream(content, **size))
+
+
+def test_dropping_unread_stream_frees_its_slot():
+    render_queue = RenderQueue(slots=1, max_queued=1)
+    render_queue.stream(content, **size)
+    gc.collect()
+    wait_idle(render_queue)
+
+    assert list(render_queue.stream(content, **size))
+
+
+def test_closing_stream_early_stops_render():
+    render_queue = RenderQueue(slots=1, max_queued=1)
+    with render_queue.stream(content, **size) as pages:
+        next(pages)
+    wait_idle(render_queue)
+
+    assert render_queue.stats()["running"] == 0
+    assert list(pages) == []
@@ -0,0 +1,22 @@
+import shutil
+from PIL import ImageFont
+from src.carousel_generator import font_path
+from src.text_measure import TextMeasurer
+
+
+def test_font_identity_does_not_depend_on_install_path(tmp_path):
+    copied_path = shutil.copy(font_path, tmp_path)
+    measurer = TextMeasurer()
+
+    assert measurer.font_identity(ImageFont.truetype(font_path, 72)) == (
+        measurer.font_identity(ImageFont.truetype(copied_path, 72))
+    )
+    assert measurer.font_identity(ImageFont.truetype(font_path, 72)) != (
+        measurer.font_identity(ImageFont.truetype(font_path, 38))
+    )
+
+
+def test_font_identity_of_default_font_is_stable():
+    assert TextMeasurer().font_identity(ImageFont.load_default()) == (
+        TextMeasurer().font_identity(ImageFont.load_default())
+    )